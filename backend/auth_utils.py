@@ -1,25 +1,150 @@
+import hashlib
 import jwt
 import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
 from functools import wraps
 from flask import request, jsonify
 from datetime import datetime, timedelta
+from dotenv import load_dotenv
+from revocation import revocation_filter
+
+load_dotenv()
 
 SECRET_KEY = os.getenv('SECRET_KEY', 'your-secret-key-change-this')
 
-def verify_token(f):
+# Access tokens are short-lived; refresh tokens mint new ones and can be revoked
+ACCESS_TOKEN_TTL = int(os.getenv('ACCESS_TOKEN_TTL', '900'))
+REFRESH_TOKEN_TTL = int(os.getenv('REFRESH_TOKEN_TTL', str(30 * 24 * 3600)))
+
+# Verified tokens remembered per process; each entry is dropped at the token's exp
+TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', '10000'))
+
+class TokenError(Exception):
+    """A request's credentials were missing or unusable; message is safe to return"""
+
+    def __init__(self, message):
+        super().__init__(message)
+        self.message = message
+
+class TokenCache:
+    """Bounded LRU of verified claims keyed by a digest of the raw token"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry['exp'] > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, claims):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = claims
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self._entries),
+            'hitRate': round(self.hits / total, 4) if total else 0.0
+        }
+
+token_cache = TokenCache(TOKEN_CACHE_SIZE)
+
+def decode_token(header):
+    """Return the claims for an Authorization header value, raising TokenError"""
+    if not header:
+        raise TokenError('Token required')
+    scheme, _, token = header.partition(' ')
+    if scheme.lower() != 'bearer' or not token or ' ' in token:
+        raise TokenError('Malformed Authorization header')
+
+    key = hashlib.sha256(token.encode('utf-8')).digest()
+    claims = token_cache.get(key)
+    if claims is None:
+        try:
+            claims = jwt.decode(token, SECRET_KEY, algorithms=['HS256'], options={'require': ['exp']})
+        except jwt.ExpiredSignatureError:
+            raise TokenError('Token expired')
+        except jwt.InvalidTokenError:
+            raise TokenError('Invalid token')
+        # Tokens issued before refresh tokens existed carry no type and are accepted until they expire
+        if claims.get('type', 'access') != 'access' or 'userId' not in claims or 'role' not in claims:
+            raise TokenError('Invalid token')
+        token_cache.put(key, claims)
+
+    # Checked on cache hits too, so a revocation takes effect before the cached entry expires
+    if 'jti' in claims and revocation_filter.is_revoked(claims['jti']):
+        raise TokenError('Token revoked')
+    return claims
+
+def decode_refresh_token(token):
+    """Return the claims of a refresh token, raising TokenError"""
+    if not token:
+        raise TokenError('Refresh token required')
+    try:
+        claims = jwt.decode(token, SECRET_KEY, algorithms=['HS256'], options={'require': ['exp', 'jti']})
+    except jwt.ExpiredSignatureError:
+        raise TokenError('Refresh token expired')
+    except jwt.InvalidTokenError:
+        raise TokenError('Invalid refresh token')
+    if claims.get('type') != 'refresh' or 'userId' not in claims:
+        raise TokenError('Invalid refresh token')
+    return claims
+
+def issue_tokens(user):
+    """Short-lived access token plus a refresh token for the given user"""
+    now = datetime.utcnow()
+    token = jwt.encode({
+        'userId': user.id,
+        'email': user.email,
+        'role': user.role,
+        'type': 'access',
+        'jti': uuid.uuid4().hex,
+        'exp': now + timedelta(seconds=ACCESS_TOKEN_TTL)
+    }, SECRET_KEY, algorithm='HS256')
+    refresh_token = jwt.encode({
+        'userId': user.id,
+        'type': 'refresh',
+        'jti': uuid.uuid4().hex,
+        'exp': now + timedelta(seconds=REFRESH_TOKEN_TTL)
+    }, SECRET_KEY, algorithm='HS256')
+    return {'token': token, 'refreshToken': refresh_token, 'expiresIn': ACCESS_TOKEN_TTL}
+
+def verify_token(f=None, role=None):
+    """Require a valid bearer token; @verify_token or @verify_token(role='admin')"""
+    if f is None:
+        return lambda view: verify_token(view, role=role)
+
     @wraps(f)
     def decorated(*args, **kwargs):
-        token = request.headers.get('Authorization')
-        
-        if not token:
-            return jsonify({'message': 'Token required'}), 401
-        
         try:
-            token = token.split(' ')[1]
-            data = jwt.decode(token, SECRET_KEY, algorithms=['HS256'])
-            request.user = data
-        except:
-            return jsonify({'message': 'Invalid token'}), 401
-        
+            request.user = decode_token(request.headers.get('Authorization'))
+        except TokenError as e:
+            return jsonify({'message': e.message}), 401
+
+        if role and request.user['role'] != role:
+            return jsonify({'message': f'{role.capitalize()} access required'}), 403
+
         return f(*args, **kwargs)
     return decorated
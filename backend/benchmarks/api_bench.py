@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""Load-test the API against a seeded SQLite or PostgreSQL database.
+
+Seeds a database with the requested volumes, starts the app in its own
+process (werkzeug, or gunicorn with several workers) and drives scripted
+scenarios with a pool of client threads:
+
+    catalog   browse GET /api/courses, a projected page and single courses
+    login     a login storm across many seeded students
+    enroll    registration rush: logged-in students enroll in a few seat-limited courses
+    admin     page through GET /api/enrollments and read /api/enrollments/stats
+
+Prints one JSON document (or writes it with --output) with throughput and
+p50/p95/p99 latency per scenario, plus the commit and volumes, so runs can be
+compared across commits:
+
+    python benchmarks/api_bench.py --users 2000 --courses 300 --enrollments 20000 --concurrency 16
+    python benchmarks/api_bench.py --database-url postgresql://localhost/bench --server gunicorn --workers 4
+
+A PostgreSQL URL must point at a disposable database; it is migrated and
+seeded in place (pass --reuse to keep data from an earlier run).
+"""
+
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCENARIOS = ('catalog', 'login', 'enroll', 'admin')
+BENCH_PASSWORD = 'bench-password'
+RUSH_COURSES = 5
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def seed(database_url, users, courses, enrollments, rng):
+    """Migrate and bulk-load bench data; returns (student ids, course ids, rush course ids)"""
+    sys.path.insert(0, BACKEND_DIR)
+    from app import create_app
+    from extensions import db
+    from models import Course, Enrollment, User
+    from migrate import upgrade
+    from seed import seed_database
+    from enrollment_stats import rebuild
+    from password_hashing import hash_with_current_params
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': database_url})
+    with app.app_context():
+        upgrade(db.engine, log=lambda message: None)
+        seed_database(db.session)
+
+        # One hash shared by every bench user keeps seeding fast; logins still verify it in full
+        password = hash_with_current_params(BENCH_PASSWORD)
+        stamp = datetime.utcnow().strftime('%Y%m%d%H%M%S')
+        db.session.execute(User.__table__.insert(), [
+            {'email': f'bench-{stamp}-{i}@bench.local', 'password': password, 'role': 'student', 'createdAt': datetime.utcnow()}
+            for i in range(users)
+        ])
+        # Through the ORM so the search columns (and SQLite's FTS table) are filled in
+        capacity = max(users // 10, 1)
+        db.session.add_all(
+            Course(name=f'Bench course {stamp}-{i}', description=f'Benchmark course number {i}', instructor=f'Instructor {i % 50}',
+                   capacity=capacity if i < RUSH_COURSES else None)
+            for i in range(courses)
+        )
+        db.session.commit()
+
+        student_ids = [r.id for r in db.session.query(User.id).filter(User.email.like(f'bench-{stamp}-%'))]
+        course_ids = [r.id for r in db.session.query(Course.id).filter(Course.name.like(f'Bench course {stamp}-%')).order_by(Course.id)]
+        rush_ids, open_ids = course_ids[:RUSH_COURSES], course_ids[RUSH_COURSES:] or course_ids
+
+        pairs = set()
+        target = min(enrollments, len(student_ids) * len(open_ids))
+        while len(pairs) < target:
+            pairs.add((rng.choice(student_ids), rng.choice(open_ids)))
+        rows = [{'studentId': s, 'courseId': c, 'enrollmentDate': datetime.utcnow()} for s, c in pairs]
+        for start in range(0, len(rows), 5000):
+            db.session.execute(Enrollment.__table__.insert(), rows[start:start + 5000])
+        db.session.commit()
+
+        with db.engine.begin() as conn:
+            rebuild(conn)
+        emails = {r.id: r.email for r in db.session.query(User.id, User.email).filter(User.id.in_(student_ids))}
+    return [(i, emails[i]) for i in student_ids], course_ids, rush_ids
+
+def existing_data(database_url):
+    """Reuse bench users and courses from an earlier run"""
+    sys.path.insert(0, BACKEND_DIR)
+    from app import create_app
+    from extensions import db
+    from models import Course, User
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': database_url})
+    with app.app_context():
+        students = [(r.id, r.email) for r in db.session.query(User.id, User.email).filter(User.email.like('bench-%@bench.local'))]
+        courses = db.session.query(Course.id, Course.capacity).filter(Course.name.like('Bench course %')).order_by(Course.id).all()
+    return students, [c.id for c in courses], [c.id for c in courses if c.capacity is not None]
+
+def start_server(args, env):
+    """Boot the app in a child process and return (process, port)"""
+    if args.server == 'gunicorn':
+        port = args.port or 5180
+        process = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', 'wsgi:app', '-w', str(args.workers), '-b', f'127.0.0.1:{port}', '--log-level', 'warning'],
+            cwd=BACKEND_DIR, env=env
+        )
+    else:
+        process = subprocess.Popen([sys.executable, __file__, '--serve', '--port', str(args.port)], env=env, stdout=subprocess.PIPE, text=True)
+        port = int(process.stdout.readline())
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            status = call(port, 'GET', '/api/health')[0]
+            if status == 200:
+                return process, port
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError('Server did not come up')
+
+def serve(port):
+    sys.path.insert(0, BACKEND_DIR)
+    import logging
+    from werkzeug.serving import make_server
+    from app import create_app
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', port, create_app(), threaded=True)
+    print(server.server_port, flush=True)
+    server.serve_forever()
+
+def call(port, method, path, body=None, token=None):
+    """One request on a fresh connection; returns (status, headers, body bytes)"""
+    headers = {'Content-Type': 'application/json'} if body is not None else {}
+    if token:
+        headers['Authorization'] = f'Bearer {token}'
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    try:
+        conn.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+        response = conn.getresponse()
+        return response.status, response.headers, response.read()
+    finally:
+        conn.close()
+
+def login(port, email, password=BENCH_PASSWORD):
+    status, _, body = call(port, 'POST', '/api/auth/login', {'email': email, 'password': password})
+    if status != 200:
+        raise RuntimeError(f'Login for {email} failed with {status}')
+    return json.loads(body)['token']
+
+def scenario_step(name, port, data, rng):
+    """Do any untimed setup (logins) and return step(rng), which issues one request of the scenario"""
+    students, course_ids, rush_ids = data
+    if name == 'catalog':
+        def step(rng):
+            roll = rng.random()
+            if roll < 0.5:
+                return call(port, 'GET', '/api/courses')
+            if roll < 0.7:
+                return call(port, 'GET', '/api/courses?limit=50&fields=id,name&sort=name')
+            return call(port, 'GET', f'/api/courses/{rng.choice(course_ids)}')
+        return step
+    if name == 'login':
+        return lambda rng: call(port, 'POST', '/api/auth/login', {'email': rng.choice(students)[1], 'password': BENCH_PASSWORD})
+    if name == 'enroll':
+        tokens = [login(port, email) for _, email in rng.sample(students, min(len(students), 200))]
+        targets = rush_ids or course_ids
+        return lambda rng: call(port, 'POST', '/api/enrollments', {'courseId': rng.choice(targets)}, rng.choice(tokens))
+    if name == 'admin':
+        from seed import ADMIN_EMAIL, ADMIN_PASSWORD
+        token = login(port, ADMIN_EMAIL, ADMIN_PASSWORD)
+        cursors = [None]
+        def step(rng):
+            if rng.random() < 0.2:
+                return call(port, 'GET', '/api/enrollments/stats', token=token)
+            cursor = rng.choice(cursors)
+            result = call(port, 'GET', '/api/enrollments?limit=100' + (f'&cursor={cursor}' if cursor else ''), token=token)
+            following = result[1].get('X-Next-Cursor')
+            if following and len(cursors) < 1000:
+                cursors.append(following)
+            return result
+        return step
+    raise ValueError(name)
+
+def run_scenario(step, concurrency, duration, seed_value):
+    """Drive step() from concurrency threads for duration seconds; returns the summary dict"""
+    latencies = []
+    statuses = Counter()
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client(index):
+        rng = random.Random(seed_value * 1000 + index)
+        local_latencies, local_statuses = [], Counter()
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                status = step(rng)[0]
+            except OSError:
+                status = 'connection-error'
+            local_latencies.append((time.perf_counter() - started) * 1000)
+            local_statuses[str(status)] += 1
+        with lock:
+            latencies.extend(local_latencies)
+            statuses.update(local_statuses)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    errors = sum(n for status, n in statuses.items() if not status.isdigit() or int(status) >= 500)
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'seconds': round(elapsed, 3),
+        'throughput_rps': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 50), 2) if latencies else None,
+        'p95_ms': round(percentile(latencies, 95), 2) if latencies else None,
+        'p99_ms': round(percentile(latencies, 99), 2) if latencies else None,
+        'max_ms': round(max(latencies), 2) if latencies else None,
+        'statuses': dict(sorted(statuses.items()))
+    }
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', help='disposable database to seed (default: a temporary SQLite file)')
+    parser.add_argument('--reuse', action='store_true', help='skip seeding and use bench data already in --database-url')
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--courses', type=int, default=200)
+    parser.add_argument('--enrollments', type=int, default=5000)
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help=f'comma-separated subset of {", ".join(SCENARIOS)}')
+    parser.add_argument('--concurrency', type=int, default=8, help='client threads per scenario')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds per scenario')
+    parser.add_argument('--server', choices=['werkzeug', 'gunicorn'], default='werkzeug')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers')
+    parser.add_argument('--port', type=int, default=0)
+    parser.add_argument('--seed', type=int, default=1, help='random seed for data and request mix')
+    parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        return serve(args.port)
+
+    scenarios = [s.strip() for s in args.scenarios.split(',') if s.strip()]
+    unknown = set(scenarios).difference(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = args.database_url or f'sqlite:///{tmp}/bench.db'
+        rng = random.Random(args.seed)
+        seed_started = time.perf_counter()
+        data = existing_data(database_url) if args.reuse else seed(database_url, args.users, args.courses, args.enrollments, rng)
+        seed_seconds = time.perf_counter() - seed_started
+        if not data[0]:
+            parser.error('no bench users found; run once without --reuse')
+
+        # Budgets only log and rate limits are off here; the metrics files stay private to this run
+        env = dict(os.environ, DATABASE_URL=database_url, QUERY_BUDGET_MODE='log', RATE_LIMIT='off', METRICS_DIR=os.path.join(tmp, 'metrics'))
+        process, port = start_server(args, env)
+        try:
+            results = {}
+            for index, name in enumerate(scenarios):
+                step = scenario_step(name, port, data, rng)
+                results[name] = run_scenario(step, args.concurrency, args.duration, args.seed + index)
+        finally:
+            process.terminate()
+            process.wait()
+
+    report = {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'database': database_url.split(':', 1)[0],
+        'server': args.server if args.server == 'werkzeug' else f'gunicorn x{args.workers}',
+        'volumes': {'users': len(data[0]), 'courses': len(data[1]), 'enrollments': None if args.reuse else args.enrollments},
+        'seed_seconds': round(seed_seconds, 2),
+        'concurrency': args.concurrency,
+        'duration_seconds': args.duration,
+        'scenarios': results
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
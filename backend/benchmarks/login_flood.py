@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""Measure GET /api/courses latency while a flood of logins hammers the same server.
+
+Boots gunicorn with the shipped gunicorn.conf.py twice, each on a fresh SQLite
+database: with HASH_WORKERS=0 (hashing inline on every request thread, the old
+behaviour) and with the bounded hashing pool. Prints one JSON object per run.
+
+    python benchmarks/login_flood.py --logins 16 --reads 30 --workers 1
+"""
+
+import argparse
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def call(port, method, path, body=None):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    try:
+        headers = {'Content-Type': 'application/json'} if body else {}
+        connection.request(method, path, body=body, headers=headers)
+        response = connection.getresponse()
+        response.read()
+        return response.status
+    finally:
+        connection.close()
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def start_gunicorn(workers, env):
+    """Boot gunicorn with gunicorn.conf.py in a child process and return (process, port)"""
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', 'wsgi:app', '-c', 'gunicorn.conf.py', '-w', str(workers),
+         '-b', f'127.0.0.1:{port}', '--log-level', 'warning'],
+        cwd=BACKEND_DIR, env=env
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            if call(port, 'GET', '/api/health') == 200:
+                return process, port
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError('gunicorn did not come up')
+
+def run_once(args, hash_workers):
+    with tempfile.TemporaryDirectory() as tmp:
+        # MIGRATE_ON_START lets wsgi.py create and seed the throwaway database in the master
+        env = dict(os.environ, HASH_WORKERS=hash_workers, RATE_LIMIT='off', MIGRATE_ON_START='1',
+                   DATABASE_URL=f'sqlite:///{tmp}/bench.db', METRICS_DIR=os.path.join(tmp, 'metrics'))
+        process, port = start_gunicorn(args.workers, env)
+        try:
+            body = json.dumps({'email': 'admin@uni.ge', 'password': 'admin123'}).encode()
+            statuses = []
+            stop = threading.Event()
+
+            def flood():
+                while not stop.is_set():
+                    try:
+                        status = call(port, 'POST', '/api/auth/login', body)
+                    except OSError:
+                        status = None
+                    statuses.append(status)
+                    if status != 200:
+                        # Rejected clients back off briefly instead of spinning on the server
+                        time.sleep(0.05)
+
+            flooders = [threading.Thread(target=flood, daemon=True) for _ in range(args.logins)]
+            for t in flooders:
+                t.start()
+            time.sleep(args.warmup)
+
+            latencies = []
+            for _ in range(args.reads):
+                started = time.perf_counter()
+                call(port, 'GET', '/api/courses')
+                latencies.append((time.perf_counter() - started) * 1000)
+
+            stop.set()
+            for t in flooders:
+                t.join()
+        finally:
+            process.terminate()
+            process.wait()
+
+    print(json.dumps({
+        'hash_workers': int(hash_workers),
+        'gunicorn_workers': args.workers,
+        'concurrent_logins': args.logins,
+        'catalog_reads': len(latencies),
+        'catalog_p50_ms': round(percentile(latencies, 50), 2),
+        'catalog_p95_ms': round(percentile(latencies, 95), 2),
+        'catalog_p99_ms': round(percentile(latencies, 99), 2),
+        'logins_ok': statuses.count(200),
+        'logins_rejected_503': statuses.count(503)
+    }), flush=True)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--logins', type=int, default=16, help='concurrent login threads')
+    parser.add_argument('--reads', type=int, default=30, help='catalog reads to time')
+    parser.add_argument('--warmup', type=float, default=1.0, help='seconds of flood before timing')
+    parser.add_argument('--workers', type=int, default=1, help='gunicorn workers')
+    args = parser.parse_args()
+
+    for hash_workers in ('0', os.getenv('HASH_WORKERS', '2')):
+        run_once(args, hash_workers)
+
+if __name__ == '__main__':
+    main()
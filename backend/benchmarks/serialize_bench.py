@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""Measure the cost of turning 10k result rows into a JSON response body.
+
+Builds real SQLAlchemy result rows (the catalog shape and the admin enrollment
+listing shape) from an in-memory SQLite database, then times three paths:
+
+    handwritten   per-route dict comprehension + Flask's default JSON provider (the old way)
+    shape+json    serializers.SHAPES projection + the stdlib encoder fallback
+    shape+orjson  serializers.SHAPES projection + orjson (skipped when not installed)
+
+Prints one JSON object with the median milliseconds per response for building
+the dicts, encoding them and both together.
+
+    python benchmarks/serialize_bench.py --rows 10000 --repeat 20
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def make_rows(count):
+    from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, Text, create_engine, select
+
+    metadata = MetaData()
+    courses = Table('courses', metadata,
+                    Column('id', Integer, primary_key=True), Column('name', String(200)), Column('description', Text),
+                    Column('instructor', String(200)), Column('capacity', Integer), Column('createdAt', DateTime))
+    enrollments = Table('enrollments', metadata,
+                        Column('id', Integer, primary_key=True), Column('studentId', Integer), Column('studentEmail', String(120)),
+                        Column('courseId', Integer), Column('courseName', String(200)), Column('enrollmentDate', DateTime))
+    engine = create_engine('sqlite://')
+    metadata.create_all(engine)
+    start = datetime(2024, 9, 1, 9, 30)
+    with engine.begin() as conn:
+        conn.execute(courses.insert(), [{
+            'id': i, 'name': f'კურსი ნომერი {i}', 'description': 'ლიმიტები, წარმოებულები და ინტეგრალები ' * 3,
+            'instructor': f'ლექტორი {i % 40}', 'capacity': 30 if i % 3 else None, 'createdAt': start + timedelta(minutes=i)
+        } for i in range(1, count + 1)])
+        conn.execute(enrollments.insert(), [{
+            'id': i, 'studentId': i % 997, 'studentEmail': f'student{i % 997}@uni.ge', 'courseId': i % 211,
+            'courseName': f'კურსი ნომერი {i % 211}', 'enrollmentDate': start + timedelta(seconds=i)
+        } for i in range(1, count + 1)])
+        return conn.execute(select(courses)).all(), conn.execute(select(enrollments)).all()
+
+def handwritten_course(rows):
+    return [{
+        'id': r.id,
+        'name': r.name,
+        'description': r.description,
+        'instructor': r.instructor,
+        'capacity': r.capacity,
+        'createdAt': r.createdAt.isoformat()
+    } for r in rows]
+
+def handwritten_enrollment(rows):
+    return [{
+        'id': r.id,
+        'studentId': r.studentId,
+        'studentEmail': r.studentEmail,
+        'courseId': r.courseId,
+        'courseName': r.courseName,
+        'enrollmentDate': r.enrollmentDate.isoformat()
+    } for r in rows]
+
+def median_ms(f, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        f()
+        samples.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(samples), 2)
+
+def measure(build, encode, rows, repeat):
+    built = build(rows)
+    return {
+        'build_ms': median_ms(lambda: build(rows), repeat),
+        'encode_ms': median_ms(lambda: encode(built), repeat),
+        'total_ms': median_ms(lambda: encode(build(rows)), repeat),
+        'bytes': len(encode(built))
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    sys.path.insert(0, BACKEND_DIR)
+    from flask import Flask
+    from flask.json.provider import DefaultJSONProvider
+    import serializers
+
+    default_provider = DefaultJSONProvider(Flask(__name__))
+    stdlib_encoder = json.JSONEncoder(default=serializers._default, ensure_ascii=False, separators=(',', ':'))
+    encoders = {
+        'handwritten': lambda obj: default_provider.dumps(obj).encode('utf-8'),
+        'shape+json': lambda obj: stdlib_encoder.encode(obj).encode('utf-8')
+    }
+    if serializers.orjson is not None:
+        encoders['shape+orjson'] = serializers.dumps
+
+    course_rows, enrollment_rows = make_rows(args.rows)
+    report = {'rows': args.rows, 'repeat': args.repeat, 'orjson': serializers.orjson is not None, 'shapes': {}}
+    for shape, rows, handwritten in (('course', course_rows, handwritten_course), ('enrollment_admin', enrollment_rows, handwritten_enrollment)):
+        results = {}
+        for path, encode in encoders.items():
+            build = handwritten if path == 'handwritten' else (lambda rows, shape=shape: serializers.serialize(shape, rows))
+            results[path] = measure(build, encode, rows, args.repeat)
+        report['shapes'][shape] = results
+    print(json.dumps(report, indent=2))
+
+if __name__ == '__main__':
+    main()
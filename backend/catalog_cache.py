@@ -0,0 +1,131 @@
+import hashlib
+import os
+import threading
+import time
+from flask import Response, request
+from sqlalchemy import text
+from serializers import dumps
+from redis_client import redis_from_url
+
+# How long a worker trusts the version it last read from the database
+CATALOG_VERSION_POLL_SECONDS = float(os.getenv('CATALOG_VERSION_POLL_SECONDS', '1'))
+
+class DatabaseVersionStore:
+    """Catalog version in the one-row catalog_version table, seen by every worker and script.
+
+    A worker re-reads it at most every poll_seconds, so an edit made through
+    another worker (or init_courses.py) reaches it within that time; its own
+    bumps are seen at once.
+    """
+
+    def __init__(self, poll_seconds):
+        self.poll_seconds = poll_seconds
+        self._lock = threading.Lock()
+        # (version, monotonic time it was read)
+        self._seen = None
+
+    def current(self):
+        seen = self._seen
+        if seen is not None and time.monotonic() - seen[1] < self.poll_seconds:
+            return seen[0]
+        from extensions import db
+        with db.engine.connect() as conn:
+            version = conn.execute(text('SELECT version FROM catalog_version WHERE id = 1')).scalar() or 0
+        self._seen = (version, time.monotonic())
+        return version
+
+    def bump(self):
+        from extensions import db
+        with self._lock, db.engine.begin() as conn:
+            conn.execute(text('UPDATE catalog_version SET version = version + 1 WHERE id = 1'))
+            version = conn.execute(text('SELECT version FROM catalog_version WHERE id = 1')).scalar()
+            self._seen = (version, time.monotonic())
+        return version
+
+class RedisVersionStore:
+    """Catalog version shared by every worker through a Redis counter"""
+
+    def __init__(self, client, key='catalog:version'):
+        self._client = client
+        self._key = key
+
+    def current(self):
+        return int(self._client.get(self._key) or 0)
+
+    def bump(self):
+        return self._client.incr(self._key)
+
+def make_version_store(url=None):
+    client = redis_from_url('CATALOG_CACHE_URL', url)
+    return DatabaseVersionStore(CATALOG_VERSION_POLL_SECONDS) if client is None else RedisVersionStore(client)
+
+class CatalogCache:
+    """Pre-serialized catalog body plus its ETag, rebuilt when the shared version moves"""
+
+    def __init__(self, store):
+        self.store = store
+        # (version, body, etag, {encoding: compressed body}) swapped as one tuple so readers never see a torn entry
+        self._entry = None
+        self._compress_lock = threading.Lock()
+
+    def get(self, build):
+        """Return (body, etag), calling build() for fresh JSON bytes only when stale"""
+        # Read the version before building so an edit made meanwhile forces another rebuild
+        version = self.store.current()
+        entry = self._entry
+        if entry is not None and entry[0] == version:
+            return entry[1], entry[2]
+
+        body = build()
+        etag = hashlib.sha1(body).hexdigest()
+        self._entry = (version, body, etag, {})
+        return body, etag
+
+    def peek_etag(self):
+        """ETag of the cached body if it is still current, without touching the database"""
+        entry = self._entry
+        if entry is not None and entry[0] == self.store.current():
+            return entry[2]
+        return None
+
+    def compressed(self, etag, encoding, compress):
+        """The body for etag compressed with encoding, or None while a background thread compresses it"""
+        entry = self._entry
+        if entry is None or entry[2] != etag:
+            return None
+        variants = entry[3]
+        with self._compress_lock:
+            if encoding in variants:
+                return variants[encoding]
+            variants[encoding] = None
+        # Strong levels take far longer than a request should wait; until the variant is ready
+        # the caller compresses at its per-request level
+        def fill():
+            variants[encoding] = compress(entry[1])
+        threading.Thread(target=fill, name=f'catalog-{encoding}', daemon=True).start()
+        return None
+
+    def invalidate(self):
+        """Drop the local copy and move the shared version so every worker rebuilds"""
+        self._entry = None
+        self.store.bump()
+
+def cached_json_response(cache, build):
+    """Serve a cached JSON body with its ETag, answering If-None-Match with a bare 304"""
+    # A warm cache answers a matching If-None-Match without building anything
+    etag = cache.peek_etag()
+    body = None
+    if etag is None or not request.if_none_match.contains_weak(etag):
+        body, etag = cache.get(lambda: dumps(build()))
+
+    # Weak comparison: compressed copies carry the same ETag marked weak
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype='application/json')
+        response.precompressed = lambda encoding, compress: cache.compressed(etag, encoding, compress)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+catalog_cache = CatalogCache(make_version_store(os.getenv('CATALOG_CACHE_URL')))
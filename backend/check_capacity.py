@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""Fire parallel enrollments at one seat-limited course and verify it is never oversubscribed"""
+
+import argparse
+import os
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from app import create_app
+from extensions import db
+from models import User, Course, Enrollment, EnrollmentDailyStat
+from migrate import upgrade
+from auth_utils import issue_tokens
+
+def run(database_url, students, capacity, workers):
+    # Every simulated student shares one address; only the seat logic is under test
+    app = create_app({'RATE_LIMIT': 'off', 'SQLALCHEMY_DATABASE_URI': database_url})
+    with app.app_context():
+        upgrade(db.engine)
+
+        stamp = datetime.utcnow().strftime('%Y%m%d%H%M%S%f')
+        course = Course(name=f'capacity-check-{stamp}', description='Concurrency check', instructor='check_capacity.py', capacity=capacity)
+        users = [User(email=f'capacity-check-{stamp}-{i}@uni.ge', password='!', role='student') for i in range(students)]
+        db.session.add(course)
+        db.session.add_all(users)
+        db.session.commit()
+        course_id = course.id
+        user_ids = [u.id for u in users]
+        tokens = [issue_tokens(u)['token'] for u in users]
+
+    def attempt(token):
+        # Each thread gets its own client and, through the scoped session, its own connection
+        client = app.test_client()
+        response = client.post('/api/enrollments', json={'courseId': course_id}, headers={'Authorization': f'Bearer {token}'})
+        return response.status_code
+
+    # Every student also retries once to exercise the duplicate path under contention
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        statuses = list(pool.map(attempt, tokens + tokens))
+
+    with app.app_context():
+        enrolled = Enrollment.query.filter_by(courseId=course_id).count()
+        seats_taken = db.session.get(Course, course_id).seatsTaken
+        daily = db.session.query(db.func.sum(EnrollmentDailyStat.enrollments)).filter_by(courseId=course_id).scalar() or 0
+
+        Enrollment.query.filter_by(courseId=course_id).delete()
+        EnrollmentDailyStat.query.filter_by(courseId=course_id).delete()
+        Course.query.filter_by(id=course_id).delete()
+        User.query.filter(User.id.in_(user_ids)).delete(synchronize_session=False)
+        db.session.commit()
+
+    print(f"Requests: {len(statuses)} | 201: {statuses.count(201)} | 409 full: {statuses.count(409)} | 400 duplicate: {statuses.count(400)} | other: {len(statuses) - statuses.count(201) - statuses.count(409) - statuses.count(400)}")
+    print(f"Capacity: {capacity} | Enrollments: {enrolled} | seatsTaken: {seats_taken} | daily stats: {daily}")
+
+    expected = min(capacity, students)
+    if enrolled != expected or seats_taken != enrolled or daily != enrolled or statuses.count(201) != enrolled:
+        print("FAILED: seat accounting is inconsistent")
+        return 1
+    print("OK: course was never oversubscribed")
+    return 0
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--database-url', help='the database to run against (default: a throwaway SQLite file)')
+    parser.add_argument('--students', type=int, default=200)
+    parser.add_argument('--capacity', type=int, default=50)
+    parser.add_argument('--workers', type=int, default=32)
+    args = parser.parse_args()
+    if args.database_url:
+        sys.exit(run(args.database_url, args.students, args.capacity, args.workers))
+    with tempfile.TemporaryDirectory() as tmp:
+        sys.exit(run(f"sqlite:///{os.path.join(tmp, 'capacity-check.db')}", args.students, args.capacity, args.workers))
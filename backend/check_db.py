@@ -1,4 +1,8 @@
-from app import app, db, User, Course, Enrollment
+from app import create_app
+from extensions import db
+from models import User, Course, Enrollment
+
+app = create_app()
 
 with app.app_context():
     print("=" * 60)
@@ -18,10 +22,13 @@ with app.app_context():
     print("\n" + "=" * 60)
     print("🎓 ENROLLMENTS")
     print("=" * 60)
-    enrollments = Enrollment.query.all()
+    # Joined in one query; e.student / e.course would lazy-load once per row
+    enrollments = db.session.query(User.email, Course.name, Enrollment.enrollmentDate).select_from(Enrollment).join(
+        User, Enrollment.studentId == User.id
+    ).join(Course, Enrollment.courseId == Course.id).order_by(Enrollment.id).all()
     if enrollments:
         for e in enrollments:
-            print(f"Student: {e.student.email} | Course: {e.course.name} | Date: {e.enrollmentDate}")
+            print(f"Student: {e.email} | Course: {e.name} | Date: {e.enrollmentDate}")
     else:
         print("No enrollments yet")
     
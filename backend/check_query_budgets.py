@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""Call every endpoint under TESTING and verify its SQL statements stay within QUERY_BUDGETS"""
+
+import argparse
+import os
+import sys
+import tempfile
+from flask import g, request
+from app import create_app
+from extensions import db
+from models import Course, User
+from seed import init_database
+from auth_utils import issue_tokens
+from password_hashing import hash_password
+from revocation import revocation_filter
+from catalog_cache import catalog_cache
+import query_budget
+
+def build_calls(ids):
+    """(endpoint, method, path, json body, token name) in an order where each call finds what it needs"""
+    course, extra = ids['course'], ids['extra']
+    return [
+        ('health.health', 'GET', '/api/health', None, None),
+        ('health.metrics', 'GET', '/api/metrics', None, None),
+        ('auth.signup', 'POST', '/api/auth/signup', {'email': 'budget-new@uni.ge', 'password': 'budget123'}, None),
+        ('auth.login', 'POST', '/api/auth/login', {'email': 'budget-student@uni.ge', 'password': 'budget123'}, None),
+        ('auth.refresh', 'POST', '/api/auth/refresh', {'refreshToken': ids['refresh']}, None),
+        ('courses.get_all_courses', 'GET', '/api/courses', None, None),
+        ('courses.get_all_courses', 'GET', '/api/courses?limit=2&fields=name,seatsTaken&sort=-name', None, None),
+        ('courses.search_courses', 'GET', '/api/courses/search?q=budget', None, None),
+        ('courses.course_stream', 'GET', '/api/courses/stream', None, None),
+        ('courses.get_course', 'GET', f'/api/courses/{course}', None, None),
+        ('courses.create_course', 'POST', '/api/courses', {'name': 'Budget check', 'description': 'Created by check_query_budgets.py', 'instructor': 'check', 'capacity': 5}, 'admin'),
+        ('enrollments.enroll', 'POST', '/api/enrollments', {'courseId': course}, 'student'),
+        ('enrollments.batch_enroll', 'POST', '/api/enrollments/batch', {'enrollments': [
+            {'studentId': ids['student'], 'courseId': extra}, {'studentId': ids['student'], 'courseId': course}
+        ]}, 'admin'),
+        ('enrollments.get_ticket', 'GET', '/api/enrollments/tickets/unknown', None, 'student'),
+        ('enrollments.get_my_courses', 'GET', '/api/enrollments/my-courses', None, 'student'),
+        ('enrollments.get_all_enrollments', 'GET', '/api/enrollments?limit=1', None, 'admin'),
+        ('enrollments.get_enrollment_stats', 'GET', '/api/enrollments/stats', None, 'admin'),
+        ('enrollments.export_enrollments', 'GET', '/api/enrollments/export?format=csv', None, 'admin'),
+        ('dashboard.get_dashboard', 'GET', '/api/dashboard', None, 'student'),
+        ('auth.export_users', 'GET', '/api/auth/users/export?format=ndjson', None, 'admin'),
+        ('auth.import_users_route', 'POST', '/api/auth/users/import', [
+            {'email': 'budget-import-1@uni.ge', 'password': 'budget123'},
+            {'email': 'budget-student@uni.ge', 'password': 'budget123'}
+        ], 'admin'),
+        ('courses.delete_course', 'DELETE', f'/api/courses/{extra}', None, 'admin'),
+        ('auth.logout', 'POST', '/api/auth/logout', {'refreshToken': ids['logout_refresh']}, 'logout')
+    ]
+
+def run(database_url):
+    # Rate limits and the enrollment queue are not what is measured here
+    app = create_app({'TESTING': True, 'RATE_LIMIT': 'off', 'SQLALCHEMY_DATABASE_URI': database_url})
+    # Raise on any overrun, whatever QUERY_BUDGET_MODE the environment sets
+    query_budget.QUERY_BUDGET_MODE = 'raise'
+    init_database(app, migrate=True)
+
+    with app.app_context():
+        student = User(email='budget-student@uni.ge', password=hash_password('budget123'), role='student')
+        admin = User(email='budget-admin@uni.ge', password='!', role='admin')
+        course = Course(name='Budget course', description='Seat-limited course for the budget check', instructor='check', capacity=10)
+        extra = Course(name='Budget extra', description='Deleted by the budget check', instructor='check')
+        db.session.add_all([student, admin, course, extra])
+        db.session.commit()
+        student_tokens, admin_tokens, logout_tokens = issue_tokens(student), issue_tokens(admin), issue_tokens(student)
+        ids = {
+            'student': student.id, 'course': course.id, 'extra': extra.id,
+            'refresh': student_tokens['refreshToken'], 'logout_refresh': logout_tokens['refreshToken']
+        }
+        tokens = {'student': student_tokens['token'], 'admin': admin_tokens['token'], 'logout': logout_tokens['token']}
+
+    counts = {}
+
+    @app.after_request
+    def remember_count(response):
+        # Registered last, so it runs before query_budget's own check raises
+        if 'query_statements' in g:
+            counts[request.endpoint] = sum(g.query_statements.values())
+        return response
+
+    client = app.test_client()
+    failures = []
+    exercised = set()
+    for endpoint, method, path, body, token in build_calls(ids):
+        exercised.add(endpoint)
+        # Worst case: this request also reloads the revocation filter and re-reads the catalog version
+        revocation_filter._loaded_at = None
+        catalog_cache.store._seen = None
+        headers = {'Authorization': f'Bearer {tokens[token]}'} if token else {}
+        counts.pop(endpoint, None)
+        try:
+            response = client.open(path, method=method, json=body, headers=headers)
+            response.close()
+        except query_budget.QueryBudgetExceeded as e:
+            failures.append(f'{endpoint}: {e}')
+            continue
+        budget = query_budget.budget_for(app, endpoint)
+        status = response.status_code
+        print(f"  {endpoint:40} {method:6} {status}  {counts.get(endpoint, 0):>2} / {budget}")
+        if status >= 400 and not (endpoint == 'enrollments.get_ticket' and status == 404):
+            failures.append(f'{endpoint}: {method} {path} answered {status}, so its budget was not exercised')
+
+    for endpoint in query_budget.unbudgeted(app):
+        failures.append(f'{endpoint}: no QUERY_BUDGETS entry')
+    for endpoint in sorted(set(app.view_functions) - exercised - {'static'}):
+        failures.append(f'{endpoint}: not called by check_query_budgets.py; add it to build_calls')
+
+    if failures:
+        print("\nFAILED:")
+        for failure in failures:
+            print(f"  {failure}")
+        return 1
+    print("\nOK: every endpoint is within its query budget")
+    return 0
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--database-url', help='an empty database to run against (default: a throwaway SQLite file)')
+    args = parser.parse_args()
+    if args.database_url:
+        sys.exit(run(args.database_url))
+    with tempfile.TemporaryDirectory() as tmp:
+        sys.exit(run(f"sqlite:///{os.path.join(tmp, 'budget-check.db')}"))
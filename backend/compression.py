@@ -0,0 +1,109 @@
+"""Response compression negotiated from Accept-Encoding.
+
+Offers brotli (br) and zstd when their packages are installed, and gzip
+always, in COMPRESSION_ENCODINGS order of preference. Only complete bodies of
+compressible types at least COMPRESSION_MIN_BYTES long are compressed;
+streamed responses (exports, the event stream) pass through untouched.
+
+A response may carry precompressed(encoding, compress) -> bytes or None to
+reuse a body compressed earlier; catalog_cache.py uses it so the catalog is
+compressed once per version, at the strongest level, off the request path,
+and then served as is. Until that copy is ready, responses are compressed at
+the per-request level.
+Compressed responses get a weak ETag, since the bytes differ per encoding.
+
+CPU time spent compressing (per thread, so concurrent requests do not inflate
+it) and bytes in and out are counted per encoding in /api/metrics.
+"""
+
+import gzip
+import os
+import time
+from flask import request
+from metrics import registry
+
+COMPRESSION_MIN_BYTES = int(os.getenv('COMPRESSION_MIN_BYTES', '1024'))
+COMPRESSION_ENCODINGS = [e.strip() for e in os.getenv('COMPRESSION_ENCODINGS', 'br,zstd,gzip').split(',') if e.strip()]
+
+COMPRESSIBLE_TYPES = ('application/json', 'text/csv', 'text/plain', 'text/html', 'application/x-ndjson')
+
+def _gzip(level):
+    return lambda data: gzip.compress(data, compresslevel=level, mtime=0)
+
+# encoding -> (compress per request, compress once for cached bodies)
+CODECS = {'gzip': (_gzip(6), _gzip(9))}
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+if brotli is not None:
+    CODECS['br'] = (lambda data: brotli.compress(data, quality=5), lambda data: brotli.compress(data, quality=11))
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+if zstandard is not None:
+    CODECS['zstd'] = (zstandard.ZstdCompressor(level=3).compress, zstandard.ZstdCompressor(level=19).compress)
+
+def available_encodings():
+    """Encodings this process can produce, in order of preference"""
+    return [e for e in COMPRESSION_ENCODINGS if e in CODECS]
+
+def negotiate(accept_encodings):
+    """Best available encoding for a parsed Accept-Encoding header, or None for identity"""
+    best, best_quality = None, 0
+    for encoding in available_encodings():
+        quality = accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+def timed(encoding, compress):
+    """Wrap compress() to count its CPU time and bytes"""
+    def run(data):
+        started = time.thread_time()
+        body = compress(data)
+        labels = (('encoding', encoding),)
+        registry.inc('compression_cpu_seconds_total', labels, time.thread_time() - started)
+        registry.inc('compression_input_bytes_total', labels, len(data))
+        registry.inc('compression_output_bytes_total', labels, len(body))
+        return body
+    return run
+
+def compress_response(response):
+    if (response.direct_passthrough or response.is_streamed or response.status_code < 200
+            or response.status_code in (204, 206, 304) or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_TYPES):
+        return response
+    response.vary.add('Accept-Encoding')
+    if response.content_length is not None and response.content_length < COMPRESSION_MIN_BYTES:
+        return response
+    encoding = negotiate(request.accept_encodings)
+    if encoding is None:
+        return response
+
+    dynamic, static = CODECS[encoding]
+    precompressed = getattr(response, 'precompressed', None)
+    body = precompressed(encoding, timed(encoding, static)) if precompressed else None
+    if body is not None:
+        registry.inc('compression_precompressed_hits_total', (('encoding', encoding),))
+    else:
+        data = response.get_data()
+        if len(data) < COMPRESSION_MIN_BYTES:
+            return response
+        body = timed(encoding, dynamic)(data)
+
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+def init_app(app):
+    """Compress eligible responses (call last, so metrics time the compression too)"""
+    if not available_encodings():
+        return
+    app.after_request(compress_response)
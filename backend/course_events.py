@@ -0,0 +1,223 @@
+"""Catalog and seat-count change events for GET /api/courses/stream.
+
+Handlers report changes after their commit:
+
+    course_events.course_created(course)
+    course_events.course_deleted(course_id)
+    course_events.seats_changed(course_ids)
+
+Catalog changes are published at once. Seat changes are coalesced: each
+worker's publisher thread wakes every SEAT_EVENT_SECONDS, reads the current
+counts of the courses touched since its last pass in one query and publishes
+one absolute `seats` event per course, so a registration rush costs one event
+per course per interval rather than one per enrollment.
+
+Events go through a broker picked by COURSE_EVENTS_URL: unset means this
+process only; redis:// fans them out to every worker (and to a separate
+stream service, see gunicorn.conf.py). In each process one hub encodes an
+event once and hands the frame to every connected client's bounded queue. A
+client that falls STREAM_CLIENT_BACKLOG frames behind is dropped with a
+`resync` event, like one that reconnects, and refetches the catalog.
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+from serializers import dumps, serialize_one
+from metrics import registry
+from redis_client import redis_from_url
+from per_process import once_per_process
+
+COURSE_EVENTS_URL = os.getenv('COURSE_EVENTS_URL')
+SEAT_EVENT_SECONDS = float(os.getenv('SEAT_EVENT_SECONDS', '0.5'))
+STREAM_MAX_CLIENTS = int(os.getenv('STREAM_MAX_CLIENTS', '1000'))
+STREAM_CLIENT_BACKLOG = int(os.getenv('STREAM_CLIENT_BACKLOG', '100'))
+STREAM_HEARTBEAT_SECONDS = float(os.getenv('STREAM_HEARTBEAT_SECONDS', '10'))
+
+# Browsers wait this long (ms) before reconnecting a dropped EventSource
+STREAM_RETRY_MS = 3000
+
+class LocalBroker:
+    """Events delivered within this process only (single worker / development)"""
+
+    def start(self, deliver):
+        self._deliver = deliver
+
+    def publish(self, event):
+        self._deliver(event)
+
+class RedisBroker:
+    """Events shared by every worker through a Redis pub/sub channel"""
+
+    def __init__(self, client, channel='courses:events'):
+        self._client = client
+        self._channel = channel
+
+    def start(self, deliver):
+        pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+
+        def listen():
+            while True:
+                try:
+                    # Subscribed here rather than by the caller, so an unreachable Redis is retried, not raised
+                    pubsub.subscribe(self._channel)
+                    for message in pubsub.listen():
+                        deliver(json.loads(message['data']))
+                except Exception:
+                    # Connection dropped: clients may have missed events, so make them refetch
+                    deliver({'event': 'resync', 'data': {}})
+                    time.sleep(1)
+
+        threading.Thread(target=listen, name='course-events', daemon=True).start()
+
+    def publish(self, event):
+        self._client.publish(self._channel, dumps(event))
+
+def make_broker(url=None):
+    client = redis_from_url('COURSE_EVENTS_URL', url)
+    return LocalBroker() if client is None else RedisBroker(client)
+
+def frame(event):
+    """One server-sent event as bytes"""
+    return b'event: ' + event['event'].encode('ascii') + b'\ndata: ' + dumps(event['data']) + b'\n\n'
+
+class Subscription:
+    """One connected client: a bounded queue of encoded frames"""
+
+    def __init__(self, backlog):
+        self.frames = queue.Queue(backlog)
+        self.dropped = False
+
+class EventHub:
+    """Fans each event out to every subscription in this process"""
+
+    def __init__(self, max_clients, backlog):
+        self.max_clients = max_clients
+        self.backlog = backlog
+        self._lock = threading.Lock()
+        self._subscriptions = set()
+
+    def subscribe(self):
+        """A new Subscription, or None when this process already serves max_clients"""
+        with self._lock:
+            if len(self._subscriptions) >= self.max_clients:
+                return None
+            subscription = Subscription(self.backlog)
+            self._subscriptions.add(subscription)
+            return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def count(self):
+        return len(self._subscriptions)
+
+    def deliver(self, event):
+        data = frame(event)
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            try:
+                subscription.frames.put_nowait(data)
+            except queue.Full:
+                subscription.dropped = True
+                self.unsubscribe(subscription)
+                registry.inc('stream_clients_dropped_total')
+
+class CourseEvents:
+    """The publisher: turns handler notifications into broker events"""
+
+    def __init__(self, broker, hub):
+        self.broker = broker
+        self.hub = hub
+        self._app = None
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._ensure_started = once_per_process(self._start)
+
+    def init_app(self, app):
+        self._app = app
+
+    def _start(self):
+        self.broker.start(self.hub.deliver)
+        threading.Thread(target=self._publish_seats_forever, name='seat-events', daemon=True).start()
+
+    def course_created(self, course):
+        """Publish a new course, already serialized with the course_detail shape"""
+        self._ensure_started()
+        self._publish({'event': 'course-created', 'data': course})
+
+    def course_deleted(self, course_id):
+        self._ensure_started()
+        with self._lock:
+            self._dirty.discard(course_id)
+        self._publish({'event': 'course-deleted', 'data': {'id': course_id}})
+
+    def _publish(self, event):
+        # Called after the handler's commit: a broker outage costs the event, not the response
+        try:
+            self.broker.publish(event)
+        except Exception:
+            self._app.logger.exception('Could not publish %s event', event['event'])
+
+    def seats_changed(self, course_ids):
+        self._ensure_started()
+        with self._lock:
+            self._dirty.update(course_ids)
+
+    def _publish_seats_forever(self):
+        while True:
+            time.sleep(SEAT_EVENT_SECONDS)
+            with self._lock:
+                dirty, self._dirty = self._dirty, set()
+            if not dirty:
+                continue
+            try:
+                for row in self._current_seats(dirty):
+                    self.broker.publish({'event': 'seats', 'data': serialize_one('seats', row)})
+            except Exception:
+                self._app.logger.exception('Could not publish seat events')
+
+    def _current_seats(self, course_ids):
+        from extensions import db
+        from models import Course
+        with self._app.app_context():
+            try:
+                return db.session.query(Course.id, Course.seatsTaken, Course.capacity).filter(
+                    Course.id.in_(course_ids)
+                ).order_by(Course.id).all()
+            finally:
+                db.session.remove()
+
+    def subscribe(self):
+        self._ensure_started()
+        return self.hub.subscribe()
+
+    def unsubscribe(self, subscription):
+        self.hub.unsubscribe(subscription)
+
+    def stream(self, subscription):
+        """Yield SSE frames for one client until it disconnects or is dropped; the caller unsubscribes"""
+        yield f'retry: {STREAM_RETRY_MS}\n\n'.encode('ascii')
+        # Anything may have changed before this connection; clients refetch on ready
+        yield frame({'event': 'ready', 'data': {}})
+        while True:
+            try:
+                yield subscription.frames.get(timeout=STREAM_HEARTBEAT_SECONDS)
+            except queue.Empty:
+                if subscription.dropped:
+                    yield frame({'event': 'resync', 'data': {}})
+                    return
+                # Comment line: keeps proxies from timing out; a failed write is how a closed client is noticed
+                yield b': keepalive\n\n'
+                continue
+            if subscription.dropped and subscription.frames.empty():
+                yield frame({'event': 'resync', 'data': {}})
+                return
+
+course_events = CourseEvents(make_broker(COURSE_EVENTS_URL), EventHub(STREAM_MAX_CLIENTS, STREAM_CLIENT_BACKLOG))
+
+registry.add_collector(lambda: {('stream_clients', ()): course_events.hub.count()})
@@ -0,0 +1,79 @@
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import tuple_
+from serializers import plain, projection
+
+# Fields a client may ask for with ?fields=; id is always returned since it anchors the cursor
+COURSE_FIELDS = ('id', 'name', 'description', 'instructor', 'capacity', 'seatsTaken', 'createdAt')
+DEFAULT_FIELDS = ('id', 'name', 'description', 'instructor', 'capacity', 'createdAt')
+
+# ?sort= values; a leading '-' sorts descending. id breaks ties so the order is total
+COURSE_SORTS = ('id', 'name', 'createdAt')
+
+def parse_fields(value):
+    """Requested field names in catalog order, raising ValueError on unknown ones"""
+    if not value:
+        return DEFAULT_FIELDS
+    requested = {f.strip() for f in value.split(',') if f.strip()}
+    unknown = requested.difference(COURSE_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return tuple(f for f in COURSE_FIELDS if f in requested or f == 'id')
+
+def parse_sort(value):
+    """(column name, descending) for a ?sort= value, raising ValueError"""
+    value = value or 'id'
+    name = value.lstrip('-')
+    if name not in COURSE_SORTS:
+        raise ValueError(f"Sort must be one of: {', '.join(COURSE_SORTS)} (prefix '-' for descending)")
+    return name, value.startswith('-')
+
+def encode_cursor(row, sort):
+    """Opaque cursor holding the last row's sort key"""
+    key = [plain(getattr(row, sort)), row.id]
+    return base64.urlsafe_b64encode(json.dumps(key).encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor, sort):
+    """Inverse of encode_cursor, raising ValueError on anything it did not produce"""
+    try:
+        value, last_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (TypeError, ValueError, UnicodeError):
+        raise ValueError('Invalid cursor')
+    if not isinstance(last_id, int) or (sort == 'id' and value != last_id):
+        raise ValueError('Invalid cursor')
+    if sort == 'createdAt':
+        try:
+            value = datetime.fromisoformat(value)
+        except (TypeError, ValueError):
+            raise ValueError('Invalid cursor')
+    return value, last_id
+
+def course_page_query(session, Course, fields, sort, descending, cursor, limit):
+    """The keyset page query, selecting only the needed columns plus one extra row"""
+    # The sort column rides along even when not requested so the next cursor can be built
+    names = fields if sort in fields else fields + (sort,)
+    sort_column = getattr(Course, sort)
+    query = session.query(*(getattr(Course, name) for name in names))
+
+    if sort == 'id':
+        order = [sort_column.desc() if descending else sort_column]
+        if cursor is not None:
+            query = query.filter(Course.id < cursor[1] if descending else Course.id > cursor[1])
+    else:
+        order = [sort_column.desc(), Course.id.desc()] if descending else [sort_column, Course.id]
+        if cursor is not None:
+            key = tuple_(sort_column, Course.id)
+            query = query.filter(key < tuple_(*cursor) if descending else key > tuple_(*cursor))
+
+    # One extra row tells whether another page exists
+    return query.order_by(*order).limit(limit + 1)
+
+def list_courses(session, Course, fields, sort, descending, cursor, limit):
+    """One page of courses as (rows, next cursor or None)"""
+    rows = course_page_query(session, Course, fields, sort, descending, cursor, limit).all()
+    next_cursor = encode_cursor(rows[limit - 1], sort) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+def course_rows_to_json(rows, fields):
+    return projection(fields).many(rows)
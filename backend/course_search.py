@@ -0,0 +1,113 @@
+import re
+import unicodedata
+from sqlalchemy import DateTime, event, inspect, text
+
+# Georgian noun endings (plural marker, cases, common postpositions), longest first.
+# Stripped from both indexed text and queries so კალკულუსი / კალკულუსის / კალკულუსში meet.
+GEORGIAN_SUFFIXES = sorted([
+    'ებისთვის', 'ებისგან', 'ებიდან', 'ებისკენ',
+    'ისთვის', 'ისგან', 'იდან', 'ისკენ', 'ებთან', 'ებში', 'ებზე', 'ებით', 'ების', 'ებმა', 'ებად',
+    'თვის', 'ები', 'ებს', 'თან', 'ში', 'ზე', 'ით', 'ად', 'ის', 'მა', 'ს', 'ი', 'ა', 'ე', 'ო'
+], key=len, reverse=True)
+MIN_STEM_LENGTH = 3
+
+# Asomtavruli/Nuskhuri letters map one-to-one onto Mkhedruli, 0x30 apart
+NUSKHURI_START, NUSKHURI_END, MKHEDRULI_START = 0x2D00, 0x2D25, 0x10D0
+
+TOKEN_RE = re.compile(r'\w+')
+
+def _is_georgian(token):
+    return 'ა' <= token[0] <= 'ჿ'
+
+def _stem(token):
+    if not _is_georgian(token):
+        return token
+    for suffix in GEORGIAN_SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= MIN_STEM_LENGTH:
+            return token[:-len(suffix)]
+    return token
+
+def tokenize(value):
+    """Normalized search tokens: NFKC, case-folded (Mtavruli -> Mkhedruli), accents dropped, stemmed"""
+    value = unicodedata.normalize('NFKC', value or '').casefold()
+    value = ''.join(
+        chr(ord(ch) - NUSKHURI_START + MKHEDRULI_START) if NUSKHURI_START <= ord(ch) <= NUSKHURI_END else ch
+        for ch in unicodedata.normalize('NFKD', value) if not unicodedata.combining(ch)
+    )
+    return [_stem(t) for t in TOKEN_RE.findall(value) if len(t) > 1 or _is_georgian(t)]
+
+def search_fields(name, description, instructor):
+    """(title, body) documents stored on the course for indexing"""
+    return ' '.join(tokenize(name)), ' '.join(tokenize(description) + tokenize(instructor))
+
+def _prefix_query(tokens, dialect):
+    # Tokens are \w-only, so quoting them is enough to keep query syntax out
+    if dialect == 'postgresql':
+        return ' & '.join(f"'{t}':*" for t in tokens)
+    return ' AND '.join(f'"{t}"*' for t in tokens)
+
+def search_courses(session, q, limit, offset):
+    """Ranked course rows matching every query token (prefix match), best first"""
+    tokens = tokenize(q)
+    if not tokens:
+        return []
+    dialect = session.bind.dialect.name
+    if dialect == 'postgresql':
+        sql = text('''
+            SELECT c.id, c.name, c.description, c.instructor, c.capacity, c."createdAt",
+                   ts_rank(c."searchVector", query) AS rank
+            FROM courses c, to_tsquery('simple', :query) query
+            WHERE c."searchVector" @@ query
+            ORDER BY rank DESC, c.id
+            LIMIT :limit OFFSET :offset
+        ''')
+    elif dialect == 'sqlite':
+        # bm25 is lower-is-better, so negate it; the title column weighs ten times the body
+        sql = text('''
+            SELECT c.id, c.name, c.description, c.instructor, c.capacity, c."createdAt",
+                   -bm25(courses_fts, 10.0, 1.0) AS rank
+            FROM courses_fts JOIN courses c ON c.id = courses_fts.rowid
+            WHERE courses_fts MATCH :query
+            ORDER BY rank DESC, c.id
+            LIMIT :limit OFFSET :offset
+        ''')
+    else:
+        raise RuntimeError(f'Course search is not implemented for {dialect}')
+    # Raw SQL skips column types, so restore the datetime conversion SQLite needs
+    sql = sql.columns(createdAt=DateTime)
+    return session.execute(sql, {'query': _prefix_query(tokens, dialect), 'limit': limit, 'offset': offset}).all()
+
+SEARCHED_FIELDS = ('name', 'description', 'instructor')
+
+def _text_changed(target):
+    state = inspect(target)
+    return any(state.attrs[field].history.has_changes() for field in SEARCHED_FIELDS)
+
+def register(Course):
+    """Keep a Course model's search columns (and SQLite's FTS5 table) in step with its text"""
+
+    @event.listens_for(Course, 'before_insert')
+    @event.listens_for(Course, 'before_update')
+    def fill_search_fields(mapper, connection, target):
+        # Seat-count updates leave the text alone and skip the re-index
+        if _text_changed(target):
+            target.searchTitle, target.searchBody = search_fields(target.name, target.description, target.instructor)
+
+    @event.listens_for(Course, 'after_insert')
+    @event.listens_for(Course, 'after_update')
+    def index_course(mapper, connection, target):
+        if connection.dialect.name == 'sqlite' and _text_changed(target):
+            connection.execute(
+                text('INSERT OR REPLACE INTO courses_fts (rowid, title, body) VALUES (:id, :title, :body)'),
+                {'id': target.id, 'title': target.searchTitle, 'body': target.searchBody}
+            )
+
+    @event.listens_for(Course, 'after_delete')
+    def unindex_course(mapper, connection, target):
+        if connection.dialect.name == 'sqlite':
+            connection.execute(text('DELETE FROM courses_fts WHERE rowid = :id'), {'id': target.id})
+
+def clear_index(connection):
+    """Empty SQLite's FTS5 table after a bulk course delete, which skips after_delete"""
+    if connection.dialect.name == 'sqlite':
+        connection.execute(text('DELETE FROM courses_fts'))
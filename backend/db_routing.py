@@ -0,0 +1,99 @@
+import itertools
+import os
+import time
+from functools import wraps
+from flask import g, has_request_context, request
+from flask_sqlalchemy import SQLAlchemy, SignallingSession
+from sqlalchemy import create_engine, event, orm
+from sqlalchemy.sql import Delete, Insert, Update
+from metrics import InstrumentedQueuePool
+
+# Reads in the window after a client's own write stay on the primary (replica lag allowance)
+REPLICA_STICKY_SECONDS = float(os.getenv('REPLICA_STICKY_SECONDS', '5'))
+
+def normalize_database_url(url):
+    # Render/Heroku hand out postgres://, which SQLAlchemy 1.4 no longer accepts
+    if url and url.startswith('postgres://'):
+        return url.replace('postgres://', 'postgresql://', 1)
+    return url
+
+def engine_options(url):
+    """create_engine() keyword arguments from DB_* environment settings"""
+    if url.startswith('sqlite'):
+        # SQLite gets Flask-SQLAlchemy's own pool choice; there is no server-side statement timeout
+        return {}
+    options = {
+        'pool_size': int(os.getenv('DB_POOL_SIZE', '5')),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '10')),
+        'pool_timeout': float(os.getenv('DB_POOL_TIMEOUT', '10')),
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', '1800')),
+        'pool_pre_ping': os.getenv('DB_POOL_PRE_PING', '1') == '1',
+        # Same pool, plus a checkout-wait histogram on /api/metrics
+        'poolclass': InstrumentedQueuePool
+    }
+    statement_timeout = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', '5000'))
+    if statement_timeout and url.startswith('postgresql'):
+        options['connect_args'] = {'options': f'-c statement_timeout={statement_timeout}'}
+    return options
+
+def read_replica(f):
+    """Mark a read-only handler whose queries may be served by a replica"""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        g.read_replica = True
+        return f(*args, **kwargs)
+    return decorated
+
+def _prefers_replica():
+    if not has_request_context() or not g.get('read_replica') or g.get('db_wrote'):
+        return False
+    # Clients echo X-Primary-Until after their own writes so the next read sees them on any worker
+    try:
+        return float(request.headers.get('X-Primary-Until', 0)) < time.time()
+    except ValueError:
+        return True
+
+class RoutingSession(SignallingSession):
+    """Sends reads from @read_replica handlers to a replica and everything else to the primary"""
+
+    def __init__(self, db, **options):
+        self.db = db
+        super().__init__(db, **options)
+
+    def get_bind(self, mapper=None, clause=None):
+        is_write = self._flushing or isinstance(clause, (Insert, Update, Delete)) or (
+            clause is not None and getattr(clause, '_for_update_arg', None) is not None
+        )
+        if is_write:
+            if has_request_context():
+                g.db_wrote = True
+        elif self.db.replica_engines and _prefers_replica():
+            return next(self.db.replica_cycle)
+        return super().get_bind(mapper, clause)
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    """Flask-SQLAlchemy with tuned pooling and optional read replicas (DATABASE_REPLICA_URLS)"""
+
+    replica_engines = ()
+    replica_cycle = None
+
+    def init_app(self, app):
+        super().init_app(app)
+        urls = [normalize_database_url(u.strip()) for u in os.getenv('DATABASE_REPLICA_URLS', '').split(',') if u.strip()]
+        self.replica_engines = [create_engine(url, **engine_options(url)) for url in urls]
+        self.replica_cycle = itertools.cycle(self.replica_engines) if self.replica_engines else None
+
+        @app.after_request
+        def mark_primary_window(response):
+            if g.get('db_wrote'):
+                response.headers['X-Primary-Until'] = f'{time.time() + REPLICA_STICKY_SECONDS:.3f}'
+            return response
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _remember_write(session, flush_context):
+    # Anything read after a flush in this request must come from the primary
+    if has_request_context():
+        g.db_wrote = True
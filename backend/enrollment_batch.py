@@ -0,0 +1,107 @@
+"""Set-based enrollment of many (studentId, courseId) pairs in the caller's transaction.
+
+Shared by POST /api/enrollments/batch and the queued enrollment worker
+(enrollment_queue.py). A fixed number of statements per batch, whatever its
+size: two existence lookups, one insert, one locking read of the touched
+courses, at most one delete of over-capacity rows, one seat update and one
+daily-stats upsert.
+"""
+
+from sqlalchemy import bindparam
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from models import Course, Enrollment, EnrollmentDailyStat, User
+from enrollment_stats import record_enrollments
+
+def insert_enrollments_ignoring_duplicates(session, rows, stamp):
+    """Insert enrollment rows in one statement, skipping unique_enrollment conflicts.
+
+    Returns {(studentId, courseId): enrollment id} for the rows actually inserted.
+    """
+    table = Enrollment.__table__
+    if session.bind.dialect.name == 'postgresql':
+        stmt = pg_insert(table).values(rows).on_conflict_do_nothing(constraint='unique_enrollment')
+        result = session.execute(stmt.returning(table.c.id, table.c.studentId, table.c.courseId))
+        return {(r.studentId, r.courseId): r.id for r in result}
+    stmt = sqlite_insert(table).values(rows).on_conflict_do_nothing(index_elements=['studentId', 'courseId'])
+    session.execute(stmt)
+    # SQLAlchemy 1.4 cannot compile RETURNING for SQLite; our rows are the ones carrying this batch's timestamp
+    result = session.query(Enrollment.id, Enrollment.studentId, Enrollment.courseId).filter(
+        Enrollment.courseId.in_({r['courseId'] for r in rows}),
+        Enrollment.enrollmentDate == stamp
+    )
+    return {(r.studentId, r.courseId): r.id for r in result}
+
+def enroll_pairs(session, results, stamp):
+    """Enroll every result dict whose status is None, dated stamp; returns the course ids that gained seats.
+
+    Each dict carries studentId and courseId and gets its status set to
+    inserted (plus enrollmentId), duplicate, full, missing-course or
+    missing-student. The caller commits.
+    """
+    pending = [r for r in results if r['status'] is None]
+
+    # Two set-based lookups classify unknown students and courses
+    course_ids = {r['courseId'] for r in pending}
+    student_ids = {r['studentId'] for r in pending}
+    known_courses = {row.id for row in session.query(Course.id).filter(Course.id.in_(course_ids))} if course_ids else set()
+    known_students = {row.id for row in session.query(User.id).filter(User.id.in_(student_ids))} if student_ids else set()
+    seen = set()
+    candidates = []
+    for r in pending:
+        key = (r['studentId'], r['courseId'])
+        if r['courseId'] not in known_courses:
+            r['status'] = 'missing-course'
+        elif r['studentId'] not in known_students:
+            r['status'] = 'missing-student'
+        elif key in seen:
+            r['status'] = 'duplicate'
+        else:
+            seen.add(key)
+            candidates.append(r)
+
+    inserted = {}
+    if candidates:
+        rows = [{'studentId': r['studentId'], 'courseId': r['courseId'], 'enrollmentDate': stamp} for r in candidates]
+        inserted = insert_enrollments_ignoring_duplicates(session, rows, stamp)
+
+    # Lock the touched courses (same order as enroll: enrollments first, then courses) and claim seats
+    per_course = {}
+    for r in candidates:
+        if (r['studentId'], r['courseId']) in inserted:
+            per_course.setdefault(r['courseId'], []).append(r)
+        else:
+            r['status'] = 'duplicate'
+    courses = []
+    if per_course:
+        courses = session.query(Course.id, Course.capacity, Course.seatsTaken).filter(
+            Course.id.in_(per_course)
+        ).order_by(Course.id).with_for_update().all()
+    surplus = []
+    seat_updates = []
+    for course in courses:
+        claimed = per_course[course.id]
+        if course.capacity is not None:
+            free = max(course.capacity - course.seatsTaken, 0)
+            surplus.extend(claimed[free:])
+            claimed = claimed[:free]
+        for r in claimed:
+            r['status'] = 'inserted'
+            r['enrollmentId'] = inserted[(r['studentId'], r['courseId'])]
+        if claimed:
+            seat_updates.append({'course_id': course.id, 'taken': len(claimed)})
+    if surplus:
+        for r in surplus:
+            r['status'] = 'full'
+        session.query(Enrollment).filter(
+            Enrollment.id.in_([inserted[(r['studentId'], r['courseId'])] for r in surplus])
+        ).delete(synchronize_session=False)
+    if seat_updates:
+        session.execute(
+            Course.__table__.update().where(Course.__table__.c.id == bindparam('course_id')).values(
+                seatsTaken=Course.__table__.c.seatsTaken + bindparam('taken')
+            ),
+            seat_updates
+        )
+        record_enrollments(session, EnrollmentDailyStat, {(u['course_id'], stamp.date()): u['taken'] for u in seat_updates})
+    return [u['course_id'] for u in seat_updates]
@@ -0,0 +1,242 @@
+"""Optional write-behind queue for POST /api/enrollments (ENROLLMENT_QUEUE=1).
+
+For registration rushes: instead of one database transaction per enrollment,
+the handler checks the course exists, appends the request to a durable local
+journal (a SQLite file in WAL mode, fsynced per append) and answers 202 with a
+ticket. One worker thread per host (whichever process holds the drain lock)
+claims up to ENROLLMENT_QUEUE_BATCH queued tickets at a time, waiting
+ENROLLMENT_QUEUE_LINGER_MS for more to pile up. It enrolls them with the
+set-based batch code in a single transaction and records each ticket's
+outcome: accepted, duplicate, full, missing-course or missing-student.
+Clients poll GET /api/enrollments/tickets/<ticket>.
+
+A claimed batch remembers the enrollmentDate it is written with. If the
+worker dies after the database commit but before the journal heard about it,
+the next drainer finds those enrollments by that date and does not enroll
+them twice.
+
+The journal is per host: keep ENROLLMENT_QUEUE_PATH on persistent disk and
+route a client's polls to the host that took its request.
+"""
+
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+from metrics import registry
+from per_process import once_per_process
+
+try:
+    import fcntl
+except ImportError:  # Windows: no file locking, single-process dev servers only
+    fcntl = None
+
+ENROLLMENT_QUEUE = os.getenv('ENROLLMENT_QUEUE', '0') == '1'
+ENROLLMENT_QUEUE_PATH = os.getenv('ENROLLMENT_QUEUE_PATH') or os.path.join(tempfile.gettempdir(), 'miniuni-enrollment-queue.db')
+ENROLLMENT_QUEUE_BATCH = int(os.getenv('ENROLLMENT_QUEUE_BATCH', '500'))
+ENROLLMENT_QUEUE_LINGER_MS = float(os.getenv('ENROLLMENT_QUEUE_LINGER_MS', '20'))
+ENROLLMENT_TICKET_TTL = int(os.getenv('ENROLLMENT_TICKET_TTL', '86400'))
+
+# How often the drainer looks for tickets appended by other processes, and prunes old ones
+POLL_SECONDS = 0.2
+PRUNE_SECONDS = 60
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS tickets (
+    ticket TEXT PRIMARY KEY,
+    studentId INTEGER NOT NULL,
+    courseId INTEGER NOT NULL,
+    requestedAt REAL NOT NULL,
+    state TEXT NOT NULL DEFAULT 'queued',
+    stamp TEXT,
+    status TEXT,
+    enrollmentId INTEGER,
+    finishedAt REAL
+);
+CREATE INDEX IF NOT EXISTS ix_tickets_state ON tickets (state);
+'''
+
+# enroll_pairs statuses as clients see them on a ticket
+TICKET_STATUSES = {'inserted': 'accepted'}
+
+class Journal:
+    """The durable queue: one SQLite file shared by every worker on this host"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _conn(self):
+        # One connection per thread, reopened after a fork
+        if getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=FULL')
+            conn.executescript(SCHEMA)
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return self._local.conn
+
+    def append(self, student_id, course_id):
+        ticket = uuid.uuid4().hex
+        self._conn().execute(
+            'INSERT INTO tickets (ticket, studentId, courseId, requestedAt) VALUES (?, ?, ?, ?)',
+            (ticket, student_id, course_id, time.time())
+        )
+        return ticket
+
+    def get(self, ticket):
+        return self._conn().execute('SELECT * FROM tickets WHERE ticket = ?', (ticket,)).fetchone()
+
+    def depth(self):
+        return self._conn().execute("SELECT COUNT(*) FROM tickets WHERE state != 'done'").fetchone()[0]
+
+    def claim(self, limit):
+        """(tickets, resumed): a batch left claimed by a previous drainer, else up to limit queued ones"""
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            rows = conn.execute("SELECT * FROM tickets WHERE state = 'claimed' ORDER BY rowid LIMIT ?", (limit,)).fetchall()
+            resumed = bool(rows)
+            if not resumed:
+                rows = conn.execute("SELECT * FROM tickets WHERE state = 'queued' ORDER BY rowid LIMIT ?", (limit,)).fetchall()
+                stamp = datetime.utcnow().isoformat()
+                conn.executemany(
+                    "UPDATE tickets SET state = 'claimed', stamp = ? WHERE ticket = ?",
+                    [(stamp, r['ticket']) for r in rows]
+                )
+                rows = [dict(r, stamp=stamp) for r in rows]
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return [dict(r) for r in rows], resumed
+
+    def finish(self, outcomes):
+        """Record [(ticket, status, enrollment id or None)] for a drained batch"""
+        now = time.time()
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.executemany(
+                "UPDATE tickets SET state = 'done', status = ?, enrollmentId = ?, finishedAt = ? WHERE ticket = ?",
+                [(status, enrollment_id, now, ticket) for ticket, status, enrollment_id in outcomes]
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def prune(self, older_than):
+        self._conn().execute("DELETE FROM tickets WHERE state = 'done' AND finishedAt < ?", (older_than,))
+
+class EnrollmentQueue:
+    """Enqueues enrollments and runs the group-commit drainer"""
+
+    def __init__(self, journal, enabled):
+        self.journal = journal
+        self.enabled = enabled
+        self._app = None
+        self._wake = threading.Event()
+        self._ensure_started = once_per_process(
+            lambda: threading.Thread(target=self._drain_forever, name='enrollment-queue', daemon=True).start()
+        )
+        self._drain_lock_file = None
+
+    def init_app(self, app):
+        self._app = app
+        if not self.enabled:
+            return
+        # Any request starts the drainer, so tickets left by a previous process do not wait for a new enrollment
+        app.before_request(self._ensure_started)
+        registry.add_collector(lambda: {('enrollment_queue_depth', ()): self.journal.depth()})
+
+    def enqueue(self, student_id, course_id):
+        """Append an enrollment request and return its ticket"""
+        ticket = self.journal.append(student_id, course_id)
+        self._wake.set()
+        return ticket
+
+    def ticket(self, ticket):
+        return self.journal.get(ticket)
+
+    def _holds_drain_lock(self):
+        # Exactly one process per host drains; the lock goes with the process if it dies
+        if fcntl is None or self._drain_lock_file is not None:
+            return True
+        f = open(f'{self.journal.path}.drain-lock', 'a')
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+        self._drain_lock_file = f
+        return True
+
+    def _drain_forever(self):
+        pruned_at = 0
+        while True:
+            if not self._holds_drain_lock():
+                time.sleep(1)
+                continue
+            self._wake.wait(POLL_SECONDS)
+            self._wake.clear()
+            try:
+                while self._drain_once():
+                    pass
+                if time.time() - pruned_at > PRUNE_SECONDS:
+                    self.journal.prune(time.time() - ENROLLMENT_TICKET_TTL)
+                    pruned_at = time.time()
+            except Exception:
+                self._app.logger.exception('Enrollment queue batch failed; retrying')
+                time.sleep(1)
+
+    def _drain_once(self):
+        """Commit one batch; False when the queue is empty"""
+        # Let concurrent requests join this batch: one commit for all of them
+        time.sleep(ENROLLMENT_QUEUE_LINGER_MS / 1000)
+        tickets, resumed = self.journal.claim(ENROLLMENT_QUEUE_BATCH)
+        if not tickets:
+            return False
+        outcomes, touched = self._commit_batch(tickets, resumed)
+        self.journal.finish(outcomes)
+
+        from course_events import course_events
+        course_events.seats_changed(touched)
+        now = time.time()
+        registry.observe('enrollment_queue_batch_size', len(tickets))
+        for t in tickets:
+            registry.observe('enrollment_queue_wait_seconds', now - t['requestedAt'])
+        return True
+
+    def _commit_batch(self, tickets, resumed):
+        from extensions import db
+        from models import Enrollment
+        from enrollment_batch import enroll_pairs
+
+        stamp = datetime.fromisoformat(tickets[0]['stamp'])
+        results = [{'ticket': t['ticket'], 'studentId': t['studentId'], 'courseId': t['courseId'], 'status': None} for t in tickets]
+        with self._app.app_context():
+            try:
+                if resumed:
+                    # Enrollments dated with this batch's stamp mean its transaction already committed
+                    committed = {(r.studentId, r.courseId): r.id for r in db.session.query(
+                        Enrollment.id, Enrollment.studentId, Enrollment.courseId
+                    ).filter(Enrollment.enrollmentDate == stamp, Enrollment.courseId.in_({t['courseId'] for t in tickets}))}
+                    for r in results:
+                        if (r['studentId'], r['courseId']) in committed:
+                            r['status'], r['enrollmentId'] = 'inserted', committed[(r['studentId'], r['courseId'])]
+                touched = enroll_pairs(db.session, results, stamp)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            finally:
+                db.session.remove()
+        outcomes = [(r['ticket'], TICKET_STATUSES.get(r['status'], r['status']), r.get('enrollmentId')) for r in results]
+        return outcomes, touched
+
+enrollment_queue = EnrollmentQueue(Journal(ENROLLMENT_QUEUE_PATH), ENROLLMENT_QUEUE)
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Per-course enrollment aggregates: courses.seatsTaken and enrollment_daily_stats.
+
+Both are updated by the enrollment handlers in the same transaction as the
+enrollments themselves. Anything that writes enrollments behind their back
+(manual SQL, scripts) can make them drift; repair with:
+
+    python enrollment_stats.py check      # report courses whose counters disagree
+    python enrollment_stats.py rebuild    # recompute everything from enrollments
+"""
+
+import argparse
+import sys
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+def record_enrollments(session, EnrollmentDailyStat, counts):
+    """Add {(courseId, day): n} to the daily aggregate inside the caller's transaction"""
+    if not counts:
+        return
+    table = EnrollmentDailyStat.__table__
+    insert = pg_insert if session.bind.dialect.name == 'postgresql' else sqlite_insert
+    # Sorted so concurrent writers touch aggregate rows in the same order
+    rows = [{'day': day, 'courseId': course_id, 'enrollments': n} for (course_id, day), n in sorted(counts.items(), key=lambda kv: (kv[0][1], kv[0][0]))]
+    stmt = insert(table).values(rows)
+    session.execute(stmt.on_conflict_do_update(
+        index_elements=['day', 'courseId'],
+        set_={'enrollments': table.c.enrollments + stmt.excluded.enrollments}
+    ))
+
+DRIFT_SQL = '''
+    SELECT c.id, c."seatsTaken", COALESCE(e.actual, 0) AS actual, COALESCE(d.daily, 0) AS daily
+    FROM courses c
+    LEFT JOIN (
+        SELECT "courseId", COUNT(*) AS actual, COUNT("enrollmentDate") AS dated FROM enrollments GROUP BY "courseId"
+    ) e ON e."courseId" = c.id
+    LEFT JOIN (SELECT "courseId", SUM(enrollments) AS daily FROM enrollment_daily_stats GROUP BY "courseId") d ON d."courseId" = c.id
+    WHERE c."seatsTaken" != COALESCE(e.actual, 0) OR COALESCE(d.daily, 0) != COALESCE(e.dated, 0)
+    ORDER BY c.id
+'''
+
+def drift(conn):
+    """Courses whose counters disagree with the enrollments table"""
+    return conn.execute(text(DRIFT_SQL)).all()
+
+def rebuild(conn):
+    """Recompute seatsTaken and the daily aggregate from enrollments in one transaction"""
+    if conn.dialect.name == 'postgresql':
+        # Block concurrent enrollments so none lands between the count and the write
+        conn.execute(text('LOCK TABLE enrollments IN SHARE MODE'))
+    conn.execute(text('''
+        UPDATE courses SET "seatsTaken" = (SELECT COUNT(*) FROM enrollments e WHERE e."courseId" = courses.id)
+    '''))
+    conn.execute(text('DELETE FROM enrollment_daily_stats'))
+    conn.execute(text('''
+        INSERT INTO enrollment_daily_stats (day, "courseId", enrollments)
+        SELECT date("enrollmentDate"), "courseId", COUNT(*) FROM enrollments
+        WHERE "enrollmentDate" IS NOT NULL
+        GROUP BY date("enrollmentDate"), "courseId"
+    '''))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=['check', 'rebuild'])
+    args = parser.parse_args()
+
+    from app import create_app
+    from extensions import db
+    with create_app().app_context(), db.engine.begin() as conn:
+        rows = drift(conn)
+        for row in rows:
+            print(f"Course {row.id}: seatsTaken={row.seatsTaken} daily={row.daily} enrollments={row.actual}")
+        if args.command == 'check':
+            print(f"{len(rows)} course(s) drifted")
+            return 1 if rows else 0
+        rebuild(conn)
+        print(f"Rebuilt enrollment stats ({len(rows)} course(s) had drifted)")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
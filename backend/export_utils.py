@@ -0,0 +1,52 @@
+import csv
+import io
+from flask import Response, request, jsonify, stream_with_context
+from serializers import dumps, plain
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8'
+}
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_BATCH_SIZE = 1000
+
+# Flush the output buffer to the client once it grows past this many characters
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+def stream_query(query):
+    """Iterate a query through a server-side cursor without buffering the result"""
+    return query.execution_options(stream_results=True).yield_per(EXPORT_BATCH_SIZE)
+
+def generate_export(rows, columns, fmt):
+    """Yield CSV or NDJSON text chunks for rows whose attributes are named by columns"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if fmt == 'csv' else None
+    if writer:
+        writer.writerow(columns)
+
+    for row in rows:
+        values = [getattr(row, column) for column in columns]
+        if writer:
+            writer.writerow([plain(v) for v in values])
+        else:
+            buffer.write(dumps(dict(zip(columns, values))).decode('utf-8'))
+            buffer.write('\n')
+        if buffer.tell() >= EXPORT_CHUNK_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def export_response(query, columns, name):
+    """Stream a query as CSV or NDJSON, picked by ?format="""
+    fmt = request.args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'message': 'Format must be csv or ndjson'}), 400
+    
+    rows = stream_query(query)
+    response = Response(stream_with_context(generate_export(rows, columns, fmt)), content_type=EXPORT_FORMATS[fmt])
+    response.headers['Content-Disposition'] = f'attachment; filename={name}.{fmt}'
+    return response
@@ -0,0 +1,5 @@
+"""Extension objects shared by models and blueprints, bound to an app by create_app()"""
+from db_routing import RoutingSQLAlchemy
+
+# Reads from @read_replica handlers go to DATABASE_REPLICA_URLS when set
+db = RoutingSQLAlchemy()
@@ -0,0 +1,38 @@
+"""Gunicorn settings, picked up automatically when gunicorn starts in this directory"""
+import os
+import shutil
+import tempfile
+
+# Threaded workers keep cheap requests (catalog reads) moving while password
+# hashing runs on its own bounded pool; see password_hashing.py
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.getenv('GUNICORN_THREADS', '8'))
+
+# /api/courses/stream holds its connection open. Under gthread every open stream
+# pins a thread, so only half the threads may stream; a gevent worker
+# (GUNICORN_WORKER_CLASS=gevent, usually as a separate stream service fed by
+# COURSE_EVENTS_URL=redis://...) holds worker_connections idle streams cheaply
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', '1000'))
+if worker_class == 'gthread':
+    os.environ.setdefault('STREAM_MAX_CLIENTS', str(max(threads // 2, 1)))
+else:
+    os.environ.setdefault('STREAM_MAX_CLIENTS', str(worker_connections))
+
+# Import wsgi.py (and run its one-time init) in the master, so workers fork
+# ready to serve and a respawned worker costs no startup queries. gevent
+# workers monkey-patch after the fork, too late for a preloaded app, so they
+# load it themselves
+preload_app = os.getenv('GUNICORN_PRELOAD', '0' if worker_class == 'gevent' else '1') == '1'
+
+# Workers share request metrics through per-worker files; see metrics.py
+os.environ.setdefault('METRICS_DIR', os.path.join(tempfile.gettempdir(), 'miniuni-metrics'))
+
+def on_starting(server):
+    # Counters restart with the master, so drop files left by a previous run
+    shutil.rmtree(os.environ['METRICS_DIR'], ignore_errors=True)
+    os.makedirs(os.environ['METRICS_DIR'], exist_ok=True)
+
+def child_exit(server, worker):
+    # Keep the exited worker's counters, drop its gauges (open streams, cache sizes)
+    from metrics import mark_worker_dead
+    mark_worker_dead(worker.pid)
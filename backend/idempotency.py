@@ -0,0 +1,199 @@
+"""Idempotency-Key support for POST and DELETE handlers.
+
+A client that sends `Idempotency-Key: <unique string>` may retry the request
+safely: the first successful (2xx) response for a key is stored for
+IDEMPOTENCY_TTL seconds and replayed, with `Idempotent-Replayed: true`, to
+any retry from the same user; after an error the key is released and a retry
+runs again. Replays run no handler code and no SQL. A retry
+that arrives while the first request is still running waits up to
+IDEMPOTENCY_WAIT_SECONDS for its response instead of running again; a key
+reused with a different method, path or body is rejected with 422. The
+marker for a running request expires after IDEMPOTENCY_PENDING_SECONDS, so a
+worker that dies mid-request frees its keys soon.
+
+Entries live in a bounded in-process LRU by default, which covers retries
+that reach the same worker. IDEMPOTENCY_URL=redis://... shares them across
+workers and hosts.
+
+Signup, login and refresh are exempt: their responses carry live tokens,
+which must not be replayed from a store after logout or revocation.
+"""
+
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import Response, jsonify, make_response, request
+from metrics import registry
+from redis_client import redis_from_url
+
+IDEMPOTENCY_TTL = int(os.getenv('IDEMPOTENCY_TTL', '86400'))
+IDEMPOTENCY_MAX_ENTRIES = int(os.getenv('IDEMPOTENCY_MAX_ENTRIES', '10000'))
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv('IDEMPOTENCY_WAIT_SECONDS', '10'))
+# Lifetime of the marker for a request still running; longer than the request timeout, short enough
+# that a worker killed mid-request does not block its key for IDEMPOTENCY_TTL
+IDEMPOTENCY_PENDING_SECONDS = int(os.getenv('IDEMPOTENCY_PENDING_SECONDS', str(max(int(6 * IDEMPOTENCY_WAIT_SECONDS), 1))))
+
+MAX_KEY_LENGTH = 255
+
+# POST endpoints that must not store responses: these ones hand out tokens
+EXEMPT_ENDPOINTS = {'auth.signup', 'auth.login', 'auth.refresh'}
+
+# Headers worth replaying along with status and body
+REPLAYED_HEADERS = ('Content-Type', 'Location', 'Retry-After', 'X-Next-Cursor')
+
+class LocalIdempotencyStore:
+    """Entries in this process only, least recently used evicted past max_entries"""
+
+    def __init__(self, max_entries, ttl, pending_ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.pending_ttl = pending_ttl
+        self._lock = threading.Lock()
+        self._done = threading.Condition(self._lock)
+        # key -> (expires, fingerprint, response tuple or None while running)
+        self._entries = OrderedDict()
+
+    def _live(self, key, now):
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] < now:
+            del self._entries[key]
+            return None
+        return entry
+
+    def claim(self, key, fingerprint, wait):
+        """None if the caller should run the request, else the stored entry's (fingerprint, response or None)"""
+        deadline = time.monotonic() + wait
+        with self._lock:
+            while True:
+                entry = self._live(key, time.time())
+                if entry is None:
+                    self._entries[key] = (time.time() + self.pending_ttl, fingerprint, None)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+                    return None
+                self._entries.move_to_end(key)
+                remaining = deadline - time.monotonic()
+                if entry[2] is not None or entry[1] != fingerprint or remaining <= 0:
+                    return entry[1], entry[2]
+                self._done.wait(remaining)
+
+    def complete(self, key, fingerprint, stored):
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl, fingerprint, stored)
+            self._done.notify_all()
+
+    def release(self, key):
+        """Forget a claim whose request failed, letting a waiting retry run it"""
+        with self._lock:
+            self._entries.pop(key, None)
+            self._done.notify_all()
+
+class RedisIdempotencyStore:
+    """Entries shared by every worker through Redis keys with a TTL"""
+
+    POLL_SECONDS = 0.05
+
+    def __init__(self, client, ttl, pending_ttl, prefix='idempotency:'):
+        self._client = client
+        self.ttl = ttl
+        self.pending_ttl = pending_ttl
+        self._prefix = prefix
+
+    def claim(self, key, fingerprint, wait):
+        deadline = time.monotonic() + wait
+        name = self._prefix + key
+        pending = json.dumps([fingerprint, None])
+        while True:
+            if self._client.set(name, pending, nx=True, ex=self.pending_ttl):
+                return None
+            raw = self._client.get(name)
+            if raw is None:
+                continue
+            stored_fingerprint, stored = json.loads(raw)
+            if stored is not None or stored_fingerprint != fingerprint or time.monotonic() >= deadline:
+                return stored_fingerprint, stored and (stored[0], stored[1], base64.b64decode(stored[2]))
+            time.sleep(self.POLL_SECONDS)
+
+    def complete(self, key, fingerprint, stored):
+        status, headers, body = stored
+        self._client.set(self._prefix + key, json.dumps([fingerprint, [status, headers, base64.b64encode(body).decode('ascii')]]), ex=self.ttl)
+
+    def release(self, key):
+        self._client.delete(self._prefix + key)
+
+def make_store(url=None):
+    client = redis_from_url('IDEMPOTENCY_URL', url)
+    if client is None:
+        return LocalIdempotencyStore(IDEMPOTENCY_MAX_ENTRIES, IDEMPOTENCY_TTL, IDEMPOTENCY_PENDING_SECONDS)
+    return RedisIdempotencyStore(client, IDEMPOTENCY_TTL, IDEMPOTENCY_PENDING_SECONDS)
+
+store = make_store(os.getenv('IDEMPOTENCY_URL'))
+
+def _fingerprint():
+    digest = hashlib.sha256()
+    for part in (request.method, request.path, request.get_data()):
+        digest.update(part if isinstance(part, bytes) else part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+def _replay(stored):
+    status, headers, body = stored
+    response = Response(body, status=status, headers=headers)
+    response.headers['Idempotent-Replayed'] = 'true'
+    registry.inc('idempotent_replays_total', (('endpoint', request.endpoint),))
+    return response
+
+def idempotent(f):
+    """Honour Idempotency-Key on a POST/DELETE view (apply under @verify_token so keys are per user)"""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        if key is None:
+            return f(*args, **kwargs)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return jsonify({'message': f'Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters'}), 400
+
+        user = getattr(request, 'user', None)
+        scoped = f"{user['userId'] if user else 'anonymous'}:{key}"
+        fingerprint = _fingerprint()
+        existing = store.claim(scoped, fingerprint, IDEMPOTENCY_WAIT_SECONDS)
+        if existing is not None:
+            stored_fingerprint, stored = existing
+            if stored_fingerprint != fingerprint:
+                return jsonify({'message': 'Idempotency-Key was already used for a different request'}), 422
+            if stored is None:
+                return jsonify({'message': 'A request with this Idempotency-Key is still in progress'}), 409, {'Retry-After': '1'}
+            return _replay(stored)
+
+        try:
+            response = make_response(f(*args, **kwargs))
+        except Exception:
+            store.release(scoped)
+            raise
+        if not 200 <= response.status_code < 300 or response.is_streamed:
+            # Only successes are kept; a retry after an error runs again
+            store.release(scoped)
+            return response
+        headers = [(name, response.headers[name]) for name in REPLAYED_HEADERS if name in response.headers]
+        store.complete(scoped, fingerprint, (response.status_code, headers, response.get_data()))
+        return response
+    decorated.idempotent = True
+    return decorated
+
+def unprotected(app):
+    """POST/DELETE endpoints, other than EXEMPT_ENDPOINTS, whose view is not wrapped in @idempotent"""
+    return sorted(
+        rule.endpoint for rule in app.url_map.iter_rules()
+        if rule.methods & {'POST', 'DELETE'} and rule.endpoint not in EXEMPT_ENDPOINTS
+        and not getattr(app.view_functions[rule.endpoint], 'idempotent', False)
+    )
+
+def init_app(app):
+    """Warn about write endpoints without @idempotent (call after registering blueprints)"""
+    for endpoint in unprotected(app):
+        app.logger.warning('Endpoint %s accepts POST/DELETE without @idempotent', endpoint)
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""Bulk-import users from a CSV (email,password[,role]) or JSON file"""
+
+import argparse
+import os
+import sys
+from dotenv import load_dotenv
+from app import create_app
+from extensions import db
+from models import User
+from user_import import import_users, parse_users
+
+load_dotenv()
+
+def print_progress(done, total):
+    print(f"  hashed {done}/{total} passwords", flush=True)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('path', help='CSV or JSON file to import')
+    parser.add_argument('--format', choices=['csv', 'json'], help='defaults to the file extension')
+    parser.add_argument('--workers', type=int, help='hashing processes (default: all cores)')
+    args = parser.parse_args()
+
+    fmt = args.format or ('json' if args.path.endswith('.json') else 'csv')
+    with open(args.path, encoding='utf-8') as f:
+        rows = parse_users(f.read(), fmt)
+    print(f"Importing {len(rows)} users from {args.path}...")
+
+    with create_app().app_context():
+        report = import_users(db.session, User, rows, workers=args.workers or os.cpu_count() or 1, progress=print_progress)
+
+    for error in report['errors']:
+        print(f"  row {error['row']}: {error.get('email', '')} {error['message']}")
+    print(f"\nCreated {report['created']} users, {report['failed']} rows failed")
+    return 0 if not report['failed'] else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
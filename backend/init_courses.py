@@ -1,78 +1,39 @@
 #!/usr/bin/env python3
-"""Initialize courses in the database"""
+"""Reset the course catalog to the default Georgian courses"""
 
-import os
-import sys
-from dotenv import load_dotenv
-from app import app, db, Course, User
-from werkzeug.security import generate_password_hash
-
-load_dotenv()
-
-# Georgian courses
-COURSES = [
-    {
-        'name': 'კალკულუსი',
-        'description': 'გამოთვლების საფუძველი - ლიმიტები, წარმოებულები, ინტეგრალები',
-        'instructor': 'ა.გ. მათემატიკა'
-    },
-    {
-        'name': 'წრფივი ალგებრა',
-        'description': 'ვექტორები, მატრიცები, სიმეტრიული სისტემები',
-        'instructor': 'ბ.კ. ალგებრა'
-    },
-    {
-        'name': 'დისკრეტული სტრუქტურები',
-        'description': 'სიმრავლეები, გრაფები, ლოგიკა, მთელი რიცხვები',
-        'instructor': 'გ.მ. დისკრეტული მათემატიკა'
-    },
-    {
-        'name': 'პითონის საწყისები',
-        'description': 'პითონის ენის საფუძვლები, ფუნქციები, მოდულები',
-        'instructor': 'დ.ს. პროგრამირება'
-    },
-    {
-        'name': 'ჯავას საწყისები',
-        'description': 'ობიექტ-ორიენტირებული პროგრამირება, კლასები, მიმოწერა',
-        'instructor': 'ე.ი. ჯავა'
-    }
-]
+from app import create_app
+from extensions import db
+from models import Course, Enrollment, EnrollmentDailyStat
+from migrate import upgrade
+from seed import COURSES, add_courses, ensure_admin, startup_lock
+from catalog_cache import catalog_cache
+import course_search
 
 def init_db():
-    """Initialize the database with courses"""
-    with app.app_context():
-        # Create all tables
-        db.create_all()
+    """Replace every course with the default catalog"""
+    app = create_app()
+    with app.app_context(), startup_lock(db.engine):
+        # Bring the schema up to date
+        upgrade(db.engine)
         
-        # Delete existing courses
+        # Delete existing courses with their enrollments and daily stats; nothing is
+        # committed until the new catalog is in, so readers never see it half reset
         existing_count = Course.query.count()
         if existing_count > 0:
-            print(f"Deleting {existing_count} existing courses...")
+            print(f"Deleting {existing_count} existing courses and their enrollments...")
+            EnrollmentDailyStat.query.delete()
+            Enrollment.query.delete()
             Course.query.delete()
-            db.session.commit()
+            # The bulk delete skips the ORM hooks that keep the search index in step
+            course_search.clear_index(db.session.connection())
         
         # Create admin user if doesn't exist
-        admin = User.query.filter_by(email='admin@uni.ge').first()
-        if not admin:
-            admin = User(
-                email='admin@uni.ge',
-                password=generate_password_hash('admin123'),
-                role='admin'
-            )
-            db.session.add(admin)
-            db.session.commit()
-            print("Created admin user: admin@uni.ge")
-        
-        # Add courses
-        for course_data in COURSES:
-            course = Course(
-                name=course_data['name'],
-                description=course_data['description'],
-                instructor=course_data['instructor']
-            )
-            db.session.add(course)
+        if ensure_admin(db.session):
+            print("Created admin user")
         
+        add_courses(db.session)
         db.session.commit()
+        catalog_cache.invalidate()
         print(f"\nSuccessfully added {len(COURSES)} Georgian courses:")
         for course in COURSES:
             print(f"  ✓ {course['name']}")
@@ -0,0 +1,283 @@
+"""Request, SQL and pool metrics in Prometheus text format.
+
+Each worker keeps its own counters behind striped locks (an update takes one
+uncontended lock for a few increments). With METRICS_DIR set, which
+gunicorn.conf.py does, every worker also writes its totals to
+METRICS_DIR/metrics-<pid>.json every METRICS_FLUSH_SECONDS from a
+background thread, and /api/metrics sums all those files. A scrape therefore covers every worker,
+whichever one answers it. When a worker exits the master folds its counters
+into metrics-archive.json and deletes its file, so its gauges go with it.
+"""
+
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from flask import Response, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+from per_process import once_per_process
+
+METRICS_DIR = os.getenv('METRICS_DIR')
+METRICS_FLUSH_SECONDS = float(os.getenv('METRICS_FLUSH_SECONDS', '1'))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+BATCH_SIZE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+# name -> (type, help, buckets or None)
+METRICS = {
+    'http_requests_total': ('counter', 'Requests by route, method and status', None),
+    'http_request_duration_seconds': ('histogram', 'Request latency by route', LATENCY_BUCKETS),
+    'db_queries_per_request': ('histogram', 'SQL statements issued per request by route', QUERY_COUNT_BUCKETS),
+    'db_query_seconds_per_request': ('histogram', 'Time spent in SQL per request by route', LATENCY_BUCKETS),
+    'db_pool_checkout_seconds': ('histogram', 'Time to get a pooled connection, including waiting for one', POOL_WAIT_BUCKETS),
+    'query_budget_violations_total': ('counter', 'Requests over their route query budget or repeating a statement per row', None),
+    'token_cache_hits_total': ('counter', 'Verified-token cache hits', None),
+    'token_cache_misses_total': ('counter', 'Verified-token cache misses', None),
+    'token_cache_entries': ('gauge', 'Verified tokens currently cached', None),
+    'stream_clients': ('gauge', 'Open /api/courses/stream connections', None),
+    'stream_clients_dropped_total': ('counter', 'Stream clients disconnected for falling too far behind', None),
+    'compression_cpu_seconds_total': ('counter', 'Thread CPU time spent compressing response bodies by encoding', None),
+    'compression_input_bytes_total': ('counter', 'Response bytes before compression by encoding', None),
+    'compression_output_bytes_total': ('counter', 'Response bytes after compression by encoding', None),
+    'compression_precompressed_hits_total': ('counter', 'Responses served from an already compressed cached body by encoding', None),
+    'rate_limited_total': ('counter', 'Requests rejected with 429 by endpoint and bucket scope (ip, user or email)', None),
+    'idempotent_replays_total': ('counter', 'Responses replayed for a repeated Idempotency-Key by endpoint', None),
+    'enrollment_queue_depth': ('gauge', 'Queued enrollment tickets not yet committed on this host', None),
+    'enrollment_queue_batch_size': ('histogram', 'Tickets committed per enrollment queue transaction', BATCH_SIZE_BUCKETS),
+    'enrollment_queue_wait_seconds': ('histogram', 'Time from enqueue to commit per enrollment ticket', LATENCY_BUCKETS)
+}
+
+class Registry:
+    """Counters and histograms keyed by (name, labels), guarded by striped locks"""
+
+    STRIPES = 16
+
+    def __init__(self):
+        self._locks = [threading.Lock() for _ in range(self.STRIPES)]
+        self._series = [{} for _ in range(self.STRIPES)]
+        self._collectors = []
+
+    def _stripe(self, key):
+        i = hash(key) % self.STRIPES
+        return self._locks[i], self._series[i]
+
+    def inc(self, name, labels=(), amount=1):
+        key = (name, labels)
+        lock, series = self._stripe(key)
+        with lock:
+            series[key] = series.get(key, 0) + amount
+
+    def observe(self, name, value, labels=()):
+        buckets = METRICS[name][2]
+        key = (name, labels)
+        lock, series = self._stripe(key)
+        with lock:
+            values = series.get(key)
+            if values is None:
+                # One slot per bucket plus +Inf, then sum
+                values = series[key] = [0] * (len(buckets) + 2)
+            values[bisect_left(buckets, value)] += 1
+            values[-1] += value
+
+    def add_collector(self, collect):
+        """Register collect() -> {(name, labels): value}, read at every snapshot"""
+        self._collectors.append(collect)
+
+    def snapshot(self):
+        """Copy of every series as {(name, labels): number or list}"""
+        merged = {}
+        for lock, series in zip(self._locks, self._series):
+            with lock:
+                merged.update((k, list(v) if isinstance(v, list) else v) for k, v in series.items())
+        for collect in self._collectors:
+            merged.update(collect())
+        return merged
+
+registry = Registry()
+
+def _dump(snapshot):
+    return [[name, [list(pair) for pair in labels], value] for (name, labels), value in snapshot.items()]
+
+def _load(entries):
+    return {(name, tuple(tuple(pair) for pair in labels)): value for name, labels, value in entries}
+
+_flush_lock = threading.Lock()
+
+def flush():
+    """Write this worker's totals to METRICS_DIR"""
+    with _flush_lock:
+        path = os.path.join(METRICS_DIR, f'metrics-{os.getpid()}.json')
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        with open(f'{path}.tmp', 'w') as f:
+            json.dump(_dump(registry.snapshot()), f)
+        os.replace(f'{path}.tmp', path)
+
+def _flush_forever():
+    while True:
+        time.sleep(METRICS_FLUSH_SECONDS)
+        try:
+            flush()
+        except OSError:
+            pass
+
+_ensure_flusher = once_per_process(lambda: threading.Thread(target=_flush_forever, name='metrics-flush', daemon=True).start())
+
+# Counters and histograms of exited workers, folded together by the gunicorn master
+ARCHIVE_FILENAME = 'metrics-archive.json'
+
+def _merge(total, worker):
+    for key, value in worker.items():
+        current = total.get(key)
+        if current is None:
+            total[key] = value
+        elif isinstance(value, list):
+            total[key] = [a + b for a, b in zip(current, value)]
+        else:
+            total[key] = current + value
+
+def _read_archive():
+    """({pid: time its file was folded in}, summed series of exited workers)"""
+    try:
+        with open(os.path.join(METRICS_DIR, ARCHIVE_FILENAME)) as f:
+            archive = json.load(f)
+    except (OSError, ValueError):
+        return {}, {}
+    return {int(pid): folded_at for pid, folded_at in archive['folded'].items()}, _load(archive['series'])
+
+def mark_worker_dead(pid):
+    """Fold an exited worker's counters and histograms into the archive and drop its gauges.
+
+    Called from the master (gunicorn.conf.py child_exit), the archive's only
+    writer. Counters stay monotonic across worker restarts, while gauges such as
+    stream_clients stop counting connections that died with the worker.
+    """
+    if not METRICS_DIR:
+        return
+    path = os.path.join(METRICS_DIR, f'metrics-{pid}.json')
+    try:
+        with open(path) as f:
+            worker = _load(json.load(f))
+    except (OSError, ValueError):
+        worker = {}
+    folded, series = _read_archive()
+    _merge(series, {key: value for key, value in worker.items() if METRICS.get(key[0], ('gauge',))[0] != 'gauge'})
+    # Until its file is removed below, collect_all skips it; entries for removed files are dropped
+    folded = {p: t for p, t in folded.items() if os.path.exists(os.path.join(METRICS_DIR, f'metrics-{p}.json'))}
+    folded[pid] = time.time()
+    archive = os.path.join(METRICS_DIR, ARCHIVE_FILENAME)
+    with open(f'{archive}.tmp', 'w') as f:
+        json.dump({'folded': {str(p): t for p, t in folded.items()}, 'series': _dump(series)}, f)
+    os.replace(f'{archive}.tmp', archive)
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+def collect_all():
+    """This worker's live totals, every other live worker's last flush and the exited workers' archive"""
+    if not METRICS_DIR:
+        return registry.snapshot()
+    flush()
+    folded, total = _read_archive()
+    for filename in os.listdir(METRICS_DIR):
+        if not (filename.startswith('metrics-') and filename.endswith('.json')) or filename == ARCHIVE_FILENAME:
+            continue
+        path = os.path.join(METRICS_DIR, filename)
+        pid = filename[len('metrics-'):-len('.json')]
+        try:
+            # Already in the archive, unless a new worker reusing the pid has written since
+            if pid.isdigit() and int(pid) in folded and os.path.getmtime(path) <= folded[int(pid)]:
+                continue
+            with open(path) as f:
+                worker = _load(json.load(f))
+        except (OSError, ValueError):
+            continue
+        _merge(total, worker)
+    return total
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (f'{k}="' + str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"' for k, v in pairs)
+    return '{' + ','.join(escaped) + '}'
+
+def render(snapshot):
+    """Prometheus text exposition (format 0.0.4) of a snapshot"""
+    by_name = {}
+    for (name, labels), value in snapshot.items():
+        by_name.setdefault(name, []).append((labels, value))
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for labels, value in sorted(by_name.get(name, ())):
+            if kind != 'histogram':
+                lines.append(f'{name}{_format_labels(labels)} {value}')
+                continue
+            cumulative = 0
+            for bound, count in zip(list(buckets) + ['+Inf'], value[:-1]):
+                cumulative += count
+                lines.append(f'{name}_bucket{_format_labels(labels, [("le", bound)])} {cumulative}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {value[-1]}')
+            lines.append(f'{name}_count{_format_labels(labels)} {cumulative}')
+    return '\n'.join(lines) + '\n'
+
+def metrics_response():
+    return Response(render(collect_all()), mimetype='text/plain; version=0.0.4')
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited (or spent connecting)"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            registry.observe('db_pool_checkout_seconds', time.perf_counter() - start)
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _query_started(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _query_finished(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_started'].pop()
+    if has_request_context() and 'request_started' in g:
+        g.db_queries += 1
+        g.db_seconds += elapsed
+
+@event.listens_for(Engine, 'handle_error')
+def _query_failed(context):
+    # after_cursor_execute does not fire for failed statements; drop their start time
+    started = context.connection.info.get('query_started') if context.connection is not None else None
+    if started:
+        started.pop()
+
+def init_app(app):
+    """Time every request and count its SQL; caller routes /api/metrics to metrics_response"""
+
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+        g.db_queries = 0
+        g.db_seconds = 0.0
+
+    @app.after_request
+    def record_request(response):
+        if 'request_started' not in g:
+            return response
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        elapsed = time.perf_counter() - g.request_started
+        registry.inc('http_requests_total', (('route', route), ('method', request.method), ('status', str(response.status_code))))
+        registry.observe('http_request_duration_seconds', elapsed, (('route', route), ('method', request.method)))
+        registry.observe('db_queries_per_request', g.db_queries, (('route', route),))
+        registry.observe('db_query_seconds_per_request', g.db_seconds, (('route', route),))
+        if METRICS_DIR:
+            _ensure_flusher()
+        return response
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""Versioned schema migrations.
+
+Each module in migrations/ named vNNNN_<name>.py defines upgrade(conn) and
+downgrade(conn); applied versions are recorded in schema_migrations. Run once
+per deploy (see Procfile) rather than from every worker:
+
+    python migrate.py upgrade            # apply everything pending
+    python migrate.py downgrade 3        # roll back to version 3
+    python migrate.py current            # print the recorded version
+    python migrate.py check-plans        # fail if a hot-route query scans a whole table
+"""
+
+import argparse
+import importlib
+import os
+import pkgutil
+import sys
+from datetime import datetime
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, inspect, select
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+
+metadata = MetaData()
+schema_migrations = Table(
+    'schema_migrations', metadata,
+    Column('version', Integer, primary_key=True),
+    Column('name', String(120), nullable=False),
+    Column('appliedAt', DateTime, nullable=False)
+)
+
+def discover():
+    """All migrations as (version, name, module), oldest first"""
+    found = []
+    for info in pkgutil.iter_modules([MIGRATIONS_DIR]):
+        prefix, _, name = info.name.partition('_')
+        if prefix.startswith('v') and prefix[1:].isdigit():
+            found.append((int(prefix[1:]), name, importlib.import_module(f'migrations.{info.name}')))
+    found.sort(key=lambda m: m[0])
+    return found
+
+def current_version(engine):
+    if not inspect(engine).has_table('schema_migrations'):
+        return 0
+    with engine.connect() as conn:
+        return conn.execute(select(func.max(schema_migrations.c.version))).scalar() or 0
+
+def latest_version():
+    migrations = discover()
+    return migrations[-1][0] if migrations else 0
+
+def upgrade(engine, target=None, log=print):
+    """Apply pending migrations up to target (default: latest), one transaction each"""
+    metadata.create_all(engine)
+    current = current_version(engine)
+    for version, name, module in discover():
+        if version <= current or (target is not None and version > target):
+            continue
+        log(f"Applying migration {version}: {name}")
+        with engine.begin() as conn:
+            module.upgrade(conn)
+            conn.execute(schema_migrations.insert().values(version=version, name=name, appliedAt=datetime.utcnow()))
+    return current_version(engine)
+
+def downgrade(engine, target, log=print):
+    """Roll back applied migrations newer than target, newest first"""
+    current = current_version(engine)
+    for version, name, module in reversed(discover()):
+        if version <= target or version > current:
+            continue
+        log(f"Reverting migration {version}: {name}")
+        with engine.begin() as conn:
+            module.downgrade(conn)
+            conn.execute(schema_migrations.delete().where(schema_migrations.c.version == version))
+    return current_version(engine)
+
+def hot_queries():
+    """The queries behind hot routes, built by the same functions the routes call, with representative parameters"""
+    from extensions import db
+    from models import Course
+    from course_listing import course_page_query
+    from routes.auth_routes import active_revocations_query, user_by_email
+    from routes.enrollment_routes import enrollments_page_query, my_courses_query, seat_available
+    return {
+        'login: user by email': user_by_email('admin@uni.ge'),
+        # Query.get issues this primary-key SELECT
+        'get_course: course by id': Course.query.filter_by(id=1),
+        'get_all_courses: page sorted by name': course_page_query(db.session, Course, ('id', 'name'), 'name', False, ('კ', 0), 50),
+        'get_all_courses: page sorted by createdAt': course_page_query(db.session, Course, ('id', 'createdAt'), 'createdAt', False, (datetime(2024, 1, 1), 0), 50),
+        'get_my_courses: enrollments by student': my_courses_query(1),
+        'get_all_enrollments: enrollments by course': enrollments_page_query(1, None, 0, 50),
+        'enroll: seat claim course row': seat_available(1),
+        'revocation filter: unexpired revoked tokens': active_revocations_query()
+    }
+
+def full_scans(conn, statement):
+    """Tables the database would read end to end for a compiled statement"""
+    dialect = conn.dialect.name
+    if dialect == 'postgresql':
+        # Small tables always look cheaper to scan; disable that so we only see missing indexes
+        conn.exec_driver_sql('SET LOCAL enable_seqscan = off')
+        sql = str(statement.compile(conn, compile_kwargs={'literal_binds': True}))
+        plan = conn.exec_driver_sql('EXPLAIN (FORMAT JSON) ' + sql).scalar()
+        scans = []
+        def walk(node):
+            if node.get('Node Type') == 'Seq Scan':
+                scans.append(node.get('Relation Name'))
+            for child in node.get('Plans', []):
+                walk(child)
+        walk(plan[0]['Plan'])
+        return scans
+    if dialect == 'sqlite':
+        sql = str(statement.compile(conn, compile_kwargs={'literal_binds': True}))
+        details = [row[-1] for row in conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + sql)]
+        return [d.split()[1] for d in details if d.startswith('SCAN ') and ' USING ' not in d]
+    raise RuntimeError(f'Plan checks are not implemented for {dialect}')
+
+def check_plans(engine):
+    """Return 1 (and print offenders) if any hot query plans a sequential scan"""
+    failures = 0
+    for label, query in hot_queries().items():
+        with engine.begin() as conn:
+            scans = full_scans(conn, query.statement)
+        status = 'seq scan on ' + ', '.join(scans) if scans else 'ok'
+        print(f"{label:50} {status}")
+        failures += bool(scans)
+    return 1 if failures else 0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='command', required=True)
+    up = sub.add_parser('upgrade')
+    up.add_argument('target', nargs='?', type=int)
+    down = sub.add_parser('downgrade')
+    down.add_argument('target', type=int)
+    sub.add_parser('current')
+    sub.add_parser('check-plans')
+    args = parser.parse_args()
+
+    from app import create_app
+    from extensions import db
+    with create_app().app_context():
+        engine = db.engine
+        if args.command == 'upgrade':
+            print(f"Schema at version {upgrade(engine, args.target)}")
+        elif args.command == 'downgrade':
+            print(f"Schema at version {downgrade(engine, args.target)}")
+        elif args.command == 'current':
+            print(f"Schema at version {current_version(engine)} (latest {latest_version()})")
+        else:
+            return check_plans(engine)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,38 @@
+"""Users, courses and enrollments as first created by db.create_all()"""
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, MetaData, String, Table, Text, UniqueConstraint
+
+metadata = MetaData()
+
+users = Table(
+    'users', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('email', String(120), unique=True, nullable=False),
+    Column('password', String(255), nullable=False),
+    Column('role', String(20)),
+    Column('createdAt', DateTime)
+)
+
+courses = Table(
+    'courses', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('name', String(120), nullable=False),
+    Column('description', Text, nullable=False),
+    Column('instructor', String(120), nullable=False),
+    Column('createdAt', DateTime)
+)
+
+enrollments = Table(
+    'enrollments', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('studentId', Integer, ForeignKey('users.id'), nullable=False),
+    Column('courseId', Integer, ForeignKey('courses.id'), nullable=False),
+    Column('enrollmentDate', DateTime),
+    UniqueConstraint('studentId', 'courseId', name='unique_enrollment')
+)
+
+def upgrade(conn):
+    # checkfirst adopts databases that were set up by create_all before migrations existed
+    metadata.create_all(conn, checkfirst=True)
+
+def downgrade(conn):
+    metadata.drop_all(conn, checkfirst=True)
@@ -0,0 +1,13 @@
+"""Seat limits: courses.capacity and courses.seatsTaken"""
+from sqlalchemy import inspect, text
+
+def upgrade(conn):
+    columns = {c['name'] for c in inspect(conn).get_columns('courses')}
+    if 'capacity' not in columns:
+        conn.execute(text('ALTER TABLE courses ADD COLUMN capacity INTEGER'))
+    if 'seatsTaken' not in columns:
+        conn.execute(text('ALTER TABLE courses ADD COLUMN "seatsTaken" INTEGER NOT NULL DEFAULT 0'))
+
+def downgrade(conn):
+    conn.execute(text('ALTER TABLE courses DROP COLUMN "seatsTaken"'))
+    conn.execute(text('ALTER TABLE courses DROP COLUMN capacity'))
@@ -0,0 +1,17 @@
+"""Revoked access/refresh token ids"""
+from sqlalchemy import Column, DateTime, MetaData, String, Table
+
+metadata = MetaData()
+
+revoked_tokens = Table(
+    'revoked_tokens', metadata,
+    Column('jti', String(64), primary_key=True),
+    Column('expiresAt', DateTime, nullable=False),
+    Column('revokedAt', DateTime)
+)
+
+def upgrade(conn):
+    revoked_tokens.create(conn, checkfirst=True)
+
+def downgrade(conn):
+    revoked_tokens.drop(conn, checkfirst=True)
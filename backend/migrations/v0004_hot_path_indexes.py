@@ -0,0 +1,22 @@
+"""Indexes for the per-course enrollment listing, course name lookups and token expiry.
+
+enrollments.studentId needs no index of its own: unique_enrollment is
+(studentId, courseId), so get_my_courses already uses its leading column.
+"""
+from sqlalchemy import inspect, text
+
+INDEXES = [
+    ('ix_enrollments_courseId', 'enrollments', 'courseId'),
+    ('ix_courses_name', 'courses', 'name'),
+    ('ix_revoked_tokens_expiresAt', 'revoked_tokens', 'expiresAt')
+]
+
+def upgrade(conn):
+    inspector = inspect(conn)
+    for name, table, column in INDEXES:
+        if name not in {ix['name'] for ix in inspector.get_indexes(table)}:
+            conn.execute(text(f'CREATE INDEX "{name}" ON {table} ("{column}")'))
+
+def downgrade(conn):
+    for name, _, _ in INDEXES:
+        conn.execute(text(f'DROP INDEX IF EXISTS "{name}"'))
@@ -0,0 +1,78 @@
+"""Full-text course search.
+
+courses.searchTitle / searchBody hold normalized, stemmed text (see
+course_search.tokenize). PostgreSQL indexes them through a generated,
+weighted tsvector column with a GIN index; SQLite keeps an FTS5 table whose
+rowid is the course id.
+
+The backfill uses a copy of the tokenizer as it stood when this migration was
+written, so later changes to course_search cannot change what it does.
+"""
+import re
+import unicodedata
+from sqlalchemy import inspect, text
+
+GEORGIAN_SUFFIXES = sorted([
+    'ებისთვის', 'ებისგან', 'ებიდან', 'ებისკენ',
+    'ისთვის', 'ისგან', 'იდან', 'ისკენ', 'ებთან', 'ებში', 'ებზე', 'ებით', 'ების', 'ებმა', 'ებად',
+    'თვის', 'ები', 'ებს', 'თან', 'ში', 'ზე', 'ით', 'ად', 'ის', 'მა', 'ს', 'ი', 'ა', 'ე', 'ო'
+], key=len, reverse=True)
+MIN_STEM_LENGTH = 3
+NUSKHURI_START, NUSKHURI_END, MKHEDRULI_START = 0x2D00, 0x2D25, 0x10D0
+TOKEN_RE = re.compile(r'\w+')
+
+def _is_georgian(token):
+    return 'ა' <= token[0] <= 'ჿ'
+
+def _stem(token):
+    if not _is_georgian(token):
+        return token
+    for suffix in GEORGIAN_SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= MIN_STEM_LENGTH:
+            return token[:-len(suffix)]
+    return token
+
+def _tokenize(value):
+    value = unicodedata.normalize('NFKC', value or '').casefold()
+    value = ''.join(
+        chr(ord(ch) - NUSKHURI_START + MKHEDRULI_START) if NUSKHURI_START <= ord(ch) <= NUSKHURI_END else ch
+        for ch in unicodedata.normalize('NFKD', value) if not unicodedata.combining(ch)
+    )
+    return [_stem(t) for t in TOKEN_RE.findall(value) if len(t) > 1 or _is_georgian(t)]
+
+def search_fields(name, description, instructor):
+    return ' '.join(_tokenize(name)), ' '.join(_tokenize(description) + _tokenize(instructor))
+
+SEARCH_VECTOR = '''
+    setweight(to_tsvector('simple', coalesce("searchTitle", '')), 'A') ||
+    setweight(to_tsvector('simple', coalesce("searchBody", '')), 'B')
+'''
+
+def upgrade(conn):
+    columns = {c['name'] for c in inspect(conn).get_columns('courses')}
+    for column in ('searchTitle', 'searchBody'):
+        if column not in columns:
+            conn.execute(text(f'ALTER TABLE courses ADD COLUMN "{column}" TEXT'))
+
+    rows = conn.execute(text('SELECT id, name, description, instructor FROM courses')).all()
+    backfill = [dict(zip(('title', 'body'), search_fields(r.name, r.description, r.instructor)), id=r.id) for r in rows]
+    if backfill:
+        conn.execute(text('UPDATE courses SET "searchTitle" = :title, "searchBody" = :body WHERE id = :id'), backfill)
+
+    if conn.dialect.name == 'postgresql':
+        if 'searchVector' not in columns:
+            conn.execute(text(f'ALTER TABLE courses ADD COLUMN "searchVector" tsvector GENERATED ALWAYS AS ({SEARCH_VECTOR}) STORED'))
+        conn.execute(text('CREATE INDEX IF NOT EXISTS ix_courses_search ON courses USING GIN ("searchVector")'))
+    elif conn.dialect.name == 'sqlite':
+        conn.execute(text('CREATE VIRTUAL TABLE IF NOT EXISTS courses_fts USING fts5(title, body)'))
+        conn.execute(text('DELETE FROM courses_fts'))
+        conn.execute(text('INSERT INTO courses_fts (rowid, title, body) SELECT id, "searchTitle", "searchBody" FROM courses'))
+
+def downgrade(conn):
+    if conn.dialect.name == 'postgresql':
+        conn.execute(text('DROP INDEX IF EXISTS ix_courses_search'))
+        conn.execute(text('ALTER TABLE courses DROP COLUMN "searchVector"'))
+    elif conn.dialect.name == 'sqlite':
+        conn.execute(text('DROP TABLE IF EXISTS courses_fts'))
+    conn.execute(text('ALTER TABLE courses DROP COLUMN "searchBody"'))
+    conn.execute(text('ALTER TABLE courses DROP COLUMN "searchTitle"'))
@@ -0,0 +1,18 @@
+"""Composite indexes for keyset-paginated course listing sorted by name or createdAt"""
+from sqlalchemy import inspect, text
+
+INDEXES = [
+    ('ix_courses_name_id', 'courses', ('name', 'id')),
+    ('ix_courses_createdAt_id', 'courses', ('createdAt', 'id'))
+]
+
+def upgrade(conn):
+    inspector = inspect(conn)
+    for name, table, columns in INDEXES:
+        if name not in {ix['name'] for ix in inspector.get_indexes(table)}:
+            column_list = ', '.join(f'"{c}"' for c in columns)
+            conn.execute(text(f'CREATE INDEX "{name}" ON {table} ({column_list})'))
+
+def downgrade(conn):
+    for name, _, _ in INDEXES:
+        conn.execute(text(f'DROP INDEX IF EXISTS "{name}"'))
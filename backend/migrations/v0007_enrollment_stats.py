@@ -0,0 +1,33 @@
+"""Daily per-course enrollment counts, backfilled (with seatsTaken) from enrollments"""
+from sqlalchemy import Column, Date, ForeignKey, Index, Integer, MetaData, Table, text
+
+metadata = MetaData()
+
+Table('courses', metadata, Column('id', Integer, primary_key=True))
+
+enrollment_daily_stats = Table(
+    'enrollment_daily_stats', metadata,
+    Column('day', Date, primary_key=True),
+    Column('courseId', Integer, ForeignKey('courses.id'), primary_key=True),
+    Column('enrollments', Integer, nullable=False, server_default='0'),
+    Index('ix_enrollment_daily_stats_courseId', 'courseId')
+)
+
+def upgrade(conn):
+    enrollment_daily_stats.create(conn, checkfirst=True)
+    # Same recount as enrollment_stats.rebuild at the time, kept here so later edits there cannot change it
+    if conn.dialect.name == 'postgresql':
+        conn.execute(text('LOCK TABLE enrollments IN SHARE MODE'))
+    conn.execute(text('''
+        UPDATE courses SET "seatsTaken" = (SELECT COUNT(*) FROM enrollments e WHERE e."courseId" = courses.id)
+    '''))
+    conn.execute(text('DELETE FROM enrollment_daily_stats'))
+    conn.execute(text('''
+        INSERT INTO enrollment_daily_stats (day, "courseId", enrollments)
+        SELECT date("enrollmentDate"), "courseId", COUNT(*) FROM enrollments
+        WHERE "enrollmentDate" IS NOT NULL
+        GROUP BY date("enrollmentDate"), "courseId"
+    '''))
+
+def downgrade(conn):
+    conn.execute(text('DROP TABLE enrollment_daily_stats'))
@@ -0,0 +1,17 @@
+"""One-row catalog version counter shared by every worker (see catalog_cache.py)"""
+from sqlalchemy import BigInteger, Column, Integer, MetaData, Table
+
+metadata = MetaData()
+
+catalog_version = Table(
+    'catalog_version', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('version', BigInteger, nullable=False, server_default='0')
+)
+
+def upgrade(conn):
+    catalog_version.create(conn, checkfirst=True)
+    conn.execute(catalog_version.insert().values(id=1, version=0))
+
+def downgrade(conn):
+    catalog_version.drop(conn, checkfirst=True)
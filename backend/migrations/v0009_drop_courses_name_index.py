@@ -0,0 +1,9 @@
+"""Drop ix_courses_name: ix_courses_name_id (name, id) serves every name lookup it did"""
+from sqlalchemy import inspect, text
+
+def upgrade(conn):
+    conn.execute(text('DROP INDEX IF EXISTS "ix_courses_name"'))
+
+def downgrade(conn):
+    if 'ix_courses_name' not in {ix['name'] for ix in inspect(conn).get_indexes('courses')}:
+        conn.execute(text('CREATE INDEX "ix_courses_name" ON courses ("name")'))
@@ -1,4 +1,5 @@
-from app import db
+from extensions import db
+import course_search
 from datetime import datetime
 
 class User(db.Model):
@@ -20,15 +21,43 @@ class Course(db.Model):
     description = db.Column(db.Text, nullable=False)
     instructor = db.Column(db.String(120), nullable=False)
     createdAt = db.Column(db.DateTime, default=datetime.utcnow)
+    capacity = db.Column(db.Integer, nullable=True)  # None means unlimited seats
+    seatsTaken = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Normalized text behind /api/courses/search, maintained by course_search
+    searchTitle = db.deferred(db.Column(db.Text))
+    searchBody = db.deferred(db.Column(db.Text))
     
     enrollments = db.relationship('Enrollment', backref='course', lazy=True, cascade='all, delete-orphan')
+    
+    # Keyset pagination on (sort column, id) for GET /api/courses
+    __table_args__ = (
+        db.Index('ix_courses_name_id', 'name', 'id'),
+        db.Index('ix_courses_createdAt_id', 'createdAt', 'id')
+    )
+
+course_search.register(Course)
 
 class Enrollment(db.Model):
     __tablename__ = 'enrollments'
     
     id = db.Column(db.Integer, primary_key=True)
     studentId = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    courseId = db.Column(db.Integer, db.ForeignKey('courses.id'), nullable=False)
+    courseId = db.Column(db.Integer, db.ForeignKey('courses.id'), nullable=False, index=True)
     enrollmentDate = db.Column(db.DateTime, default=datetime.utcnow)
     
     __table_args__ = (db.UniqueConstraint('studentId', 'courseId', name='unique_enrollment'),)
+
+class EnrollmentDailyStat(db.Model):
+    # Enrollments per course per day, kept in step by the enrollment handlers (see enrollment_stats.py)
+    __tablename__ = 'enrollment_daily_stats'
+    
+    day = db.Column(db.Date, primary_key=True)
+    courseId = db.Column(db.Integer, db.ForeignKey('courses.id'), primary_key=True, index=True)
+    enrollments = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+class RevokedToken(db.Model):
+    __tablename__ = 'revoked_tokens'
+    
+    jti = db.Column(db.String(64), primary_key=True)
+    expiresAt = db.Column(db.DateTime, nullable=False, index=True)
+    revokedAt = db.Column(db.DateTime, default=datetime.utcnow)
@@ -0,0 +1,71 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+# Hash parameters, e.g. pbkdf2:sha256:600000 or scrypt:32768:8:1
+PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'pbkdf2')
+PASSWORD_SALT_LENGTH = int(os.getenv('PASSWORD_SALT_LENGTH', '16'))
+
+# Threads per process doing KDF work (hashlib releases the GIL); 0 hashes inline on the request thread
+HASH_WORKERS = int(os.getenv('HASH_WORKERS', '2'))
+# Extra hashing requests allowed to wait for a thread before new ones are turned away
+HASH_QUEUE_DEPTH = int(os.getenv('HASH_QUEUE_DEPTH', '4'))
+
+class HashingBusy(Exception):
+    """The hashing queue is full; the caller should answer 503 and let the client retry"""
+
+def canonical_method(method):
+    """Spell out werkzeug's defaults so stored hash prefixes can be compared"""
+    name, *args = method.split(':')
+    if name == 'pbkdf2':
+        hash_name = args[0] if args else 'sha256'
+        iterations = args[1] if len(args) > 1 else DEFAULT_PBKDF2_ITERATIONS
+        return f'pbkdf2:{hash_name}:{iterations}'
+    if name == 'scrypt':
+        n, r, p = args if args else (2 ** 15, 8, 1)
+        return f'scrypt:{n}:{r}:{p}'
+    return method
+
+CURRENT_METHOD = canonical_method(PASSWORD_HASH_METHOD)
+
+# Picklable, so the bulk importer can ship it to a process pool
+hash_with_current_params = partial(generate_password_hash, method=PASSWORD_HASH_METHOD, salt_length=PASSWORD_SALT_LENGTH)
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(max(HASH_WORKERS, 1) + HASH_QUEUE_DEPTH)
+
+def _get_executor():
+    # Threads do not survive fork, so each gunicorn worker builds its own pool on first use
+    global _executor, _executor_pid
+    if _executor_pid != os.getpid():
+        with _executor_lock:
+            if _executor_pid != os.getpid():
+                _executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix='password-hash')
+                _executor_pid = os.getpid()
+    return _executor
+
+def _run(fn, *args, wait=False):
+    if HASH_WORKERS <= 0:
+        return fn(*args)
+    if not _slots.acquire(blocking=wait):
+        raise HashingBusy()
+    try:
+        return _get_executor().submit(fn, *args).result()
+    finally:
+        _slots.release()
+
+def hash_password(password, wait=False):
+    """Hash with the configured parameters on the bounded hashing pool; wait=True queues for a slot instead of raising HashingBusy"""
+    return _run(hash_with_current_params, password, wait=wait)
+
+def verify_password(stored, password):
+    """Check a password against its stored hash on the bounded hashing pool"""
+    return _run(check_password_hash, stored, password)
+
+def needs_rehash(stored):
+    """True when a stored hash was made with parameters other than the configured ones"""
+    return stored.split('$', 1)[0] != CURRENT_METHOD
@@ -0,0 +1,25 @@
+"""Start background work once in every worker process.
+
+Threads do not survive the fork from a preloading gunicorn master, so a thread
+started at import time would run in the master only. Background threads are
+instead started on first use, once per pid.
+"""
+import os
+import threading
+
+def once_per_process(start):
+    """A function that calls start() the first time it runs in each process"""
+    lock = threading.Lock()
+    started_pid = None
+
+    def ensure():
+        nonlocal started_pid
+        if started_pid == os.getpid():
+            return
+        with lock:
+            if started_pid == os.getpid():
+                return
+            started_pid = os.getpid()
+        start()
+
+    return ensure
@@ -0,0 +1,112 @@
+"""Per-route SQL query budgets and N+1 detection.
+
+Every endpoint has a ceiling on the statements one request may issue, from
+QUERY_BUDGETS below or a @query_budget(n) decorator on the view. A request
+over budget, or one that runs the same statement REPEATED_STATEMENT_LIMIT
+times or more with different parameters (the usual N+1 shape), raises
+QueryBudgetExceeded when the app is in testing mode and is logged otherwise,
+debug mode included. QUERY_BUDGET_MODE=raise|log|off overrides the choice.
+check_query_budgets.py calls every endpoint and fails on any overrun.
+
+Statements run while a streamed body is generated (the exports) happen after
+the response leaves the view and are not counted.
+"""
+
+import os
+from collections import Counter
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from metrics import registry
+
+QUERY_BUDGET_MODE = os.getenv('QUERY_BUDGET_MODE')
+REPEATED_STATEMENT_LIMIT = int(os.getenv('REPEATED_STATEMENT_LIMIT', '5'))
+
+# Measured statement counts per endpoint; authenticated routes get one more for
+# the revocation filter's periodic reload. Raise a number only together with
+# the change that needs it.
+QUERY_BUDGETS = {
+    'auth.signup': 3,
+    'auth.login': 3,
+    'auth.refresh': 5,
+    'auth.logout': 6,
+    'auth.export_users': 1,
+    'auth.import_users_route': 12,  # per 1000 rows: one email lookup, one insert (plus a read-back on SQLite)
+    'courses.get_all_courses': 2,  # plus the catalog version read, at most once a second
+    'courses.search_courses': 1,
+    'courses.course_stream': 0,
+    'courses.get_course': 1,
+    'courses.create_course': 6,
+    'courses.delete_course': 9,
+    'enrollments.enroll': 4,
+    'enrollments.batch_enroll': 8,
+    'enrollments.get_ticket': 1,
+    'enrollments.get_my_courses': 2,
+    'enrollments.get_all_enrollments': 2,
+    'enrollments.get_enrollment_stats': 3,
+    'enrollments.export_enrollments': 1,
+    'dashboard.get_dashboard': 2,
+    'health.health': 0,
+    'health.metrics': 0
+}
+
+class QueryBudgetExceeded(AssertionError):
+    """A request issued more statements than its route allows, or repeated one per row"""
+
+def query_budget(limit):
+    """Give a view its own statement ceiling instead of the QUERY_BUDGETS entry"""
+    def decorate(f):
+        f.query_budget = limit
+        return f
+    return decorate
+
+def budget_for(app, endpoint):
+    view = app.view_functions.get(endpoint)
+    return getattr(view, 'query_budget', QUERY_BUDGETS.get(endpoint))
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _remember_statement(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and 'query_statements' in g:
+        g.query_statements[statement] += 1
+
+def check_request(statements, budget):
+    """Problems with one request's statements, as human-readable strings"""
+    problems = []
+    total = sum(statements.values())
+    if budget is not None and total > budget:
+        problems.append(f'{total} queries, budget {budget}')
+    for statement, count in statements.items():
+        if count >= REPEATED_STATEMENT_LIMIT:
+            problems.append(f'{count}x same statement (N+1?): {" ".join(statement.split())[:200]}')
+    return problems
+
+def unbudgeted(app):
+    """Endpoints with neither a QUERY_BUDGETS entry nor a @query_budget"""
+    return sorted(e for e in app.view_functions if e != 'static' and budget_for(app, e) is None)
+
+def init_app(app):
+    """Count each request's statements and enforce its route budget (call after registering blueprints)"""
+    if QUERY_BUDGET_MODE == 'off':
+        return
+    for endpoint in unbudgeted(app):
+        app.logger.warning('No query budget for endpoint %s; add it to QUERY_BUDGETS', endpoint)
+
+    @app.before_request
+    def start_counting():
+        g.query_statements = Counter()
+
+    @app.after_request
+    def enforce_budget(response):
+        if 'query_statements' not in g or request.endpoint is None:
+            return response
+        problems = check_request(g.query_statements, budget_for(app, request.endpoint))
+        if not problems:
+            return response
+        registry.inc('query_budget_violations_total', (('endpoint', request.endpoint),))
+        message = f'{request.method} {request.path} ({request.endpoint}): ' + '; '.join(problems)
+        # Only tests raise: a debug server someone deployed must not turn an overrun into a 500
+        mode = QUERY_BUDGET_MODE or ('raise' if current_app.testing else 'log')
+        if mode == 'raise':
+            raise QueryBudgetExceeded(message)
+        current_app.logger.warning('Query budget exceeded: %s', message)
+        return response
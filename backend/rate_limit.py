@@ -0,0 +1,217 @@
+"""Token-bucket rate limiting per client IP and per user.
+
+Every request is charged one token from each of its route policy's buckets:
+one keyed by client IP, one keyed by user id for requests carrying a valid
+bearer token and, on signup and login, one keyed by the email in the body
+together with the client's network (/24 for IPv4, /64 for IPv6). That slows
+password guessing against one account from any one network, while a flood
+from elsewhere cannot lock its owner out. Policies come from ROUTE_POLICIES
+below, defaulting to 'read' for GET and 'write' otherwise; a bucket holds
+`burst` tokens and refills at `per_minute`. A request is charged to all of
+its buckets or to none: one finding any bucket empty gets 429 with
+Retry-After, spends nothing, and is counted in rate_limited_total.
+
+Buckets live in this process by default (O(1) per check; each gunicorn
+worker limits on its own, so the effective limit scales with the worker
+count). RATE_LIMIT_URL=redis://... keeps them in Redis, shared by every
+worker. RATE_LIMIT=off disables limiting (benchmarks, load tests).
+
+Behind a reverse proxy set RATE_LIMIT_TRUSTED_PROXIES to the number of
+proxies that append to X-Forwarded-For, so the client address is used rather
+than the proxy's; it defaults to 1 on Render (RENDER is set), else 0. Without
+it every client shares the proxy's address, and so its buckets.
+"""
+
+import ipaddress
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, jsonify, request
+from metrics import registry
+from redis_client import redis_from_url
+from auth_utils import TokenError, decode_token
+
+RATE_LIMIT = os.getenv('RATE_LIMIT', 'on')
+RATE_LIMIT_MAX_KEYS = int(os.getenv('RATE_LIMIT_MAX_KEYS', '100000'))
+RATE_LIMIT_TRUSTED_PROXIES = int(os.getenv('RATE_LIMIT_TRUSTED_PROXIES') or ('1' if os.getenv('RENDER') else '0'))
+
+# policy -> {scope: (tokens per minute, burst)}
+POLICIES = {
+    # Password hashing on every call: a handful per minute per account and
+    # network, more per address since a campus network may sit behind one
+    'auth': {'ip': (60, 30), 'email': (5, 5)},
+    'refresh': {'ip': (30, 10)},
+    'write': {'ip': (120, 60), 'user': (60, 20)},
+    'read': {'ip': (1200, 200), 'user': (600, 100)}
+}
+
+# Endpoints that do not use their method's default policy; None means unlimited
+ROUTE_POLICIES = {
+    'auth.signup': 'auth',
+    'auth.login': 'auth',
+    'auth.refresh': 'refresh',
+    'health.health': None,
+    'health.metrics': None
+}
+
+class LocalBuckets:
+    """Buckets in this process: striped locks, each stripe an LRU capped at max_keys / STRIPES"""
+
+    STRIPES = 16
+
+    def __init__(self, max_keys):
+        self._per_stripe = max(max_keys // self.STRIPES, 1)
+        self._locks = [threading.Lock() for _ in range(self.STRIPES)]
+        # key -> [tokens, last refill (monotonic seconds)]
+        self._buckets = [OrderedDict() for _ in range(self.STRIPES)]
+
+    def take(self, limits):
+        """Take a token from every (key, per_minute, burst) bucket, or from none.
+
+        Returns (0, None) when taken, else (seconds until the refusing bucket
+        has a token, its index in limits).
+        """
+        stripes = sorted({hash(key) % self.STRIPES for key, _, _ in limits})
+        now = time.monotonic()
+        # Stripes locked in index order, so concurrent multi-key takes cannot deadlock
+        for i in stripes:
+            self._locks[i].acquire()
+        try:
+            found = []
+            for index, (key, per_minute, burst) in enumerate(limits):
+                buckets = self._buckets[hash(key) % self.STRIPES]
+                bucket = buckets.get(key)
+                if bucket is None:
+                    bucket = buckets[key] = [burst, now]
+                else:
+                    buckets.move_to_end(key)
+                    bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * per_minute / 60)
+                    bucket[1] = now
+                if bucket[0] < 1:
+                    return (1 - bucket[0]) / (per_minute / 60), index
+                found.append(bucket)
+            for bucket in found:
+                bucket[0] -= 1
+            return 0, None
+        finally:
+            for i in stripes:
+                while len(self._buckets[i]) > self._per_stripe:
+                    # The least recently seen client starts over with a full bucket
+                    self._buckets[i].popitem(last=False)
+                self._locks[i].release()
+
+# Refill every bucket and take from all of them, or from none, in one round
+# trip, timed by the Redis server clock so workers agree. ARGV holds a
+# (rate, burst) pair per key; returns {wait, 1-based index of the refusing key}
+TAKE_SCRIPT = '''
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local tokens = {}
+for i, key in ipairs(KEYS) do
+    local rate, burst = tonumber(ARGV[2 * i - 1]), tonumber(ARGV[2 * i])
+    local bucket = redis.call('HMGET', key, 'tokens', 'at')
+    local available, at = tonumber(bucket[1]) or burst, tonumber(bucket[2]) or now
+    available = math.min(burst, available + (now - at) * rate)
+    if available < 1 then
+        return {tostring((1 - available) / rate), i}
+    end
+    tokens[i] = available
+end
+for i, key in ipairs(KEYS) do
+    local rate, burst = tonumber(ARGV[2 * i - 1]), tonumber(ARGV[2 * i])
+    redis.call('HSET', key, 'tokens', tokens[i] - 1, 'at', now)
+    redis.call('EXPIRE', key, math.ceil(burst / rate) + 1)
+end
+return {'0', 0}
+'''
+
+class RedisBuckets:
+    """Buckets shared by every worker, each a Redis hash updated by one script call"""
+
+    def __init__(self, client, prefix='ratelimit:'):
+        self._client = client
+        self._take = self._client.register_script(TAKE_SCRIPT)
+        self._prefix = prefix
+
+    def take(self, limits):
+        args = []
+        for _, per_minute, burst in limits:
+            args += [per_minute / 60, burst]
+        wait, index = self._take(keys=[self._prefix + key for key, _, _ in limits], args=args)
+        wait = float(wait)
+        return (wait, index - 1) if wait else (0, None)
+
+def make_buckets(url=None):
+    client = redis_from_url('RATE_LIMIT_URL', url)
+    return LocalBuckets(RATE_LIMIT_MAX_KEYS) if client is None else RedisBuckets(client)
+
+buckets = make_buckets(os.getenv('RATE_LIMIT_URL'))
+
+def client_ip():
+    if RATE_LIMIT_TRUSTED_PROXIES:
+        forwarded = [ip.strip() for ip in request.headers.get('X-Forwarded-For', '').split(',') if ip.strip()]
+        if len(forwarded) >= RATE_LIMIT_TRUSTED_PROXIES:
+            return forwarded[-RATE_LIMIT_TRUSTED_PROXIES]
+    return request.remote_addr or 'unknown'
+
+def _user_id():
+    # Verified tokens are cached, so this costs a dictionary lookup on the hot path
+    header = request.headers.get('Authorization')
+    if not header:
+        return None
+    try:
+        return decode_token(header)['userId']
+    except TokenError:
+        return None
+
+def network(ip):
+    """The /24 (IPv4) or /64 (IPv6) network an address belongs to"""
+    try:
+        address = ipaddress.ip_address(ip)
+    except ValueError:
+        return ip
+    prefix = 24 if address.version == 4 else 64
+    return str(ipaddress.ip_network(f'{address}/{prefix}', strict=False))
+
+def _email():
+    data = request.get_json(silent=True)
+    email = data.get('email') if isinstance(data, dict) else None
+    return email.strip().lower()[:254] if isinstance(email, str) and email.strip() else None
+
+def policy_for(endpoint, method):
+    if endpoint in ROUTE_POLICIES:
+        return ROUTE_POLICIES[endpoint]
+    return 'read' if method in ('GET', 'HEAD') else 'write'
+
+def check_request():
+    """before_request hook: charge the request to its buckets, answering 429 when one is empty"""
+    if request.endpoint is None or request.method == 'OPTIONS':
+        return None
+    if current_app.config.get('RATE_LIMIT', RATE_LIMIT) == 'off':
+        return None
+    policy = policy_for(request.endpoint, request.method)
+    if policy is None:
+        return None
+
+    limits = POLICIES[policy]
+    ip = client_ip()
+    identities = [('ip', ip)]
+    if 'user' in limits:
+        user_id = _user_id()
+        if user_id is not None:
+            identities.append(('user', user_id))
+    if 'email' in limits:
+        email = _email()
+        if email is not None:
+            identities.append(('email', f'{email}:{network(ip)}'))
+    wait, refused = buckets.take([(f'{policy}:{scope}:{identity}', *limits[scope]) for scope, identity in identities])
+    if wait:
+        registry.inc('rate_limited_total', (('endpoint', request.endpoint), ('scope', identities[refused][0])))
+        return jsonify({'message': 'Too many requests, please retry later'}), 429, {'Retry-After': str(max(math.ceil(wait), 1))}
+    return None
+
+def init_app(app):
+    """Limit every request (call after metrics.init_app so rejected requests are still timed)"""
+    app.before_request(check_request)
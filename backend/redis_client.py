@@ -0,0 +1,22 @@
+"""Redis connections for the backends that can be shared across workers.
+
+The catalog version (CATALOG_CACHE_URL), course events (COURSE_EVENTS_URL),
+idempotency keys (IDEMPOTENCY_URL) and rate-limit buckets (RATE_LIMIT_URL)
+each keep their state in this process unless their setting holds a
+redis://, rediss:// or unix:// URL. The redis package is an optional
+dependency: `pip install -r requirements-redis.txt`.
+"""
+
+REDIS_SCHEMES = ('redis://', 'rediss://', 'unix://')
+
+def redis_from_url(setting, url):
+    """A Redis client for the URL in `setting`, or None when it is unset"""
+    if not url:
+        return None
+    if not url.startswith(REDIS_SCHEMES):
+        raise ValueError(f'{setting} must be a redis://, rediss:// or unix:// URL, got {url}')
+    try:
+        import redis
+    except ImportError:
+        raise RuntimeError(f'{setting} points at Redis but the redis package is not installed (pip install -r requirements-redis.txt)')
+    return redis.Redis.from_url(url)
@@ -0,0 +1,103 @@
+import hashlib
+import math
+import os
+import threading
+import time
+from flask import current_app
+
+# How often each worker reloads the revoked-jti set from the database
+REVOCATION_REFRESH_SECONDS = float(os.getenv('REVOCATION_REFRESH_SECONDS', '30'))
+# After a failed reload, how long to keep the last good filter before trying again
+REVOCATION_RETRY_SECONDS = float(os.getenv('REVOCATION_RETRY_SECONDS', '5'))
+# Minimum filter size and target false-positive rate; positives are confirmed against the table
+REVOCATION_FILTER_CAPACITY = int(os.getenv('REVOCATION_FILTER_CAPACITY', '10000'))
+REVOCATION_FILTER_ERROR_RATE = float(os.getenv('REVOCATION_FILTER_ERROR_RATE', '0.001'))
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings using double hashing of one SHA-256 digest"""
+
+    def __init__(self, capacity, error_rate):
+        capacity = max(capacity, 1)
+        self.size = max(8, int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))))
+        self.hashes = max(1, int(round(self.size / capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        digest = hashlib.sha256(item.encode('utf-8')).digest()
+        h1 = int.from_bytes(digest[:8], 'big')
+        h2 = int.from_bytes(digest[8:16], 'big') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+class RevocationFilter:
+    """Per-process view of revoked token ids.
+
+    Negative answers (the common case) come from the Bloom filter alone; a hit is
+    confirmed with one lookup so false positives never lock anybody out.
+    """
+
+    def __init__(self, refresh_seconds, retry_seconds, capacity, error_rate):
+        self.refresh_seconds = refresh_seconds
+        self.retry_seconds = retry_seconds
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._load_active = None
+        self._lookup = None
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._loaded_at = None
+        self._retry_at = 0
+        self._refresh_lock = threading.Lock()
+
+    def configure(self, load_active, lookup):
+        """load_active() -> iterable of unexpired revoked jtis; lookup(jti) -> bool"""
+        self._load_active = load_active
+        self._lookup = lookup
+        self._loaded_at = None
+
+    def _maybe_refresh(self):
+        if self._load_active is None:
+            return
+        now = time.monotonic()
+        if self._loaded_at is not None and (now - self._loaded_at < self.refresh_seconds or now < self._retry_at):
+            return
+        # Until the first load everyone waits: the empty filter would let revoked tokens through.
+        # After that one thread rebuilds and everyone else keeps answering from the last good filter
+        first = self._loaded_at is None
+        if not self._refresh_lock.acquire(blocking=first):
+            return
+        try:
+            if first and self._loaded_at is not None:
+                return
+            try:
+                jtis = list(self._load_active())
+            except Exception:
+                if first:
+                    raise
+                current_app.logger.exception('Could not reload revoked tokens; keeping the last filter')
+                self._retry_at = time.monotonic() + self.retry_seconds
+                return
+            bloom = BloomFilter(max(self.capacity, 2 * len(jtis)), self.error_rate)
+            for jti in jtis:
+                bloom.add(jti)
+            self._bloom = bloom
+            self._loaded_at = time.monotonic()
+        finally:
+            self._refresh_lock.release()
+
+    def add(self, jti):
+        """Record a revocation made by this process without waiting for the next reload"""
+        self._bloom.add(jti)
+
+    def is_revoked(self, jti):
+        self._maybe_refresh()
+        if jti not in self._bloom:
+            return False
+        return self._lookup(jti) if self._lookup else True
+
+revocation_filter = RevocationFilter(REVOCATION_REFRESH_SECONDS, REVOCATION_RETRY_SECONDS, REVOCATION_FILTER_CAPACITY, REVOCATION_FILTER_ERROR_RATE)
@@ -1,15 +1,21 @@
 from flask import Blueprint, request, jsonify
-from werkzeug.security import generate_password_hash, check_password_hash
-import jwt
-import os
-from datetime import datetime, timedelta
-from app import db
-from models import User
+from datetime import datetime
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from extensions import db
+from models import User, RevokedToken
+from auth_utils import TokenError, decode_refresh_token, issue_tokens, verify_token
+from idempotency import idempotent
+from revocation import revocation_filter
+from db_routing import read_replica
+from export_utils import export_response
+from serializers import serialize_one
+from config import USER_IMPORT_MAX_ROWS
+from user_import import import_users, parse_users
+from password_hashing import HashingBusy, hash_password, needs_rehash, verify_password
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/api/auth')
 
-SECRET_KEY = os.getenv('SECRET_KEY', 'your-secret-key-change-this')
-
 @auth_bp.route('/signup', methods=['POST'])
 def signup():
     data = request.get_json()
@@ -20,7 +26,7 @@ def signup():
     if User.query.filter_by(email=data['email']).first():
         return jsonify({'message': 'Email already exists'}), 400
     
-    hashed_password = generate_password_hash(data['password'])
+    hashed_password = hash_password(data['password'])
     role = data.get('role', 'student')
     
     new_user = User(
@@ -32,20 +38,14 @@ def signup():
     db.session.add(new_user)
     db.session.commit()
     
-    token = jwt.encode({
-        'userId': new_user.id,
-        'email': new_user.email,
-        'role': new_user.role,
-        'exp': datetime.utcnow() + timedelta(days=30)
-    }, SECRET_KEY, algorithm='HS256')
-    
     return jsonify({
-        'token': token,
-        'userId': new_user.id,
-        'role': new_user.role,
-        'email': new_user.email
+        **issue_tokens(new_user),
+        **serialize_one('user', new_user)
     }), 201
 
+def user_by_email(email):
+    return User.query.filter_by(email=email)
+
 @auth_bp.route('/login', methods=['POST'])
 def login():
     data = request.get_json()
@@ -53,21 +53,126 @@ def login():
     if not data or not data.get('email') or not data.get('password'):
         return jsonify({'message': 'Email and password required'}), 400
     
-    user = User.query.filter_by(email=data['email']).first()
+    user = user_by_email(data['email']).first()
     
-    if not user or not check_password_hash(user.password, data['password']):
+    if not user or not verify_password(user.password, data['password']):
         return jsonify({'message': 'Invalid email or password'}), 401
     
-    token = jwt.encode({
-        'userId': user.id,
-        'email': user.email,
-        'role': user.role,
-        'exp': datetime.utcnow() + timedelta(days=30)
-    }, SECRET_KEY, algorithm='HS256')
+    if needs_rehash(user.password):
+        # Upgrade hashes made with outdated parameters while we still hold the plaintext
+        try:
+            user.password = hash_password(data['password'])
+            db.session.commit()
+        except HashingBusy:
+            pass
+    
+    return jsonify({
+        **issue_tokens(user),
+        **serialize_one('user', user)
+    }), 200
+
+@auth_bp.route('/refresh', methods=['POST'])
+def refresh():
+    data = request.get_json(silent=True) or {}
+    
+    try:
+        claims = decode_refresh_token(data.get('refreshToken'))
+    except TokenError as e:
+        return jsonify({'message': e.message}), 401
+    
+    # Rotate: revoking the presented token is the check, so of two concurrent refreshes only one wins
+    if not claim_jti(claims['jti'], claims['exp']):
+        db.session.rollback()
+        return jsonify({'message': 'Refresh token revoked'}), 401
+    
+    user = db.session.get(User, claims['userId'])
+    if not user:
+        db.session.rollback()
+        return jsonify({'message': 'User not found'}), 401
+    db.session.commit()
     
     return jsonify({
-        'token': token,
-        'userId': user.id,
-        'role': user.role,
-        'email': user.email
+        **issue_tokens(user),
+        **serialize_one('user', user)
     }), 200
+
+@auth_bp.route('/logout', methods=['POST'])
+@verify_token
+@idempotent
+def logout():
+    data = request.get_json(silent=True) or {}
+    
+    if 'jti' in request.user:
+        revoke_jti(request.user['jti'], request.user['exp'])
+    
+    if data.get('refreshToken'):
+        try:
+            claims = decode_refresh_token(data['refreshToken'])
+            if claims['userId'] == request.user['userId']:
+                revoke_jti(claims['jti'], claims['exp'])
+        except TokenError:
+            pass
+    
+    RevokedToken.query.filter(RevokedToken.expiresAt < datetime.utcnow()).delete(synchronize_session=False)
+    db.session.commit()
+    
+    return jsonify({'message': 'Logged out'}), 200
+
+def revoke_jti(jti, exp):
+    """Record a revoked token id (caller commits) and tell this worker's filter right away"""
+    db.session.merge(RevokedToken(jti=jti, expiresAt=datetime.utcfromtimestamp(exp)))
+    revocation_filter.add(jti)
+
+def claim_jti(jti, exp):
+    """Revoke a token id with one conditional insert (caller commits); False if it was already revoked"""
+    table = RevokedToken.__table__
+    insert = pg_insert if db.session.bind.dialect.name == 'postgresql' else sqlite_insert
+    result = db.session.execute(
+        insert(table).values(jti=jti, expiresAt=datetime.utcfromtimestamp(exp), revokedAt=datetime.utcnow())
+        .on_conflict_do_nothing(index_elements=['jti'])
+    )
+    if result.rowcount != 1:
+        return False
+    revocation_filter.add(jti)
+    return True
+
+def jti_is_revoked(jti):
+    return db.session.query(RevokedToken.jti).filter_by(jti=jti).first() is not None
+
+def active_revocations_query():
+    return db.session.query(RevokedToken.jti).filter(RevokedToken.expiresAt > datetime.utcnow())
+
+def load_revoked_jtis():
+    try:
+        return [jti for (jti,) in active_revocations_query()]
+    except Exception:
+        # The filter may carry on with its last good copy, so leave the session usable for the request
+        db.session.rollback()
+        raise
+
+revocation_filter.configure(load_revoked_jtis, jti_is_revoked)
+
+@auth_bp.route('/users/export', methods=['GET'])
+@verify_token(role='admin')
+@read_replica
+def export_users():
+    query = db.session.query(User.id, User.email, User.role, User.createdAt).order_by(User.id)
+    return export_response(query, ['id', 'email', 'role', 'createdAt'], 'users')
+
+@auth_bp.route('/users/import', methods=['POST'])
+@verify_token(role='admin')
+@idempotent
+def import_users_route():
+    try:
+        if request.mimetype == 'text/csv':
+            rows = parse_users(request.get_data(as_text=True), 'csv')
+        else:
+            rows = parse_users(request.get_data(as_text=True), 'json')
+    except ValueError as e:
+        return jsonify({'message': f'Could not parse import: {e}'}), 400
+    if len(rows) > USER_IMPORT_MAX_ROWS:
+        return jsonify({'message': f'At most {USER_IMPORT_MAX_ROWS} users per request; import larger files with import_users.py'}), 400
+    
+    # Hashed on the shared bounded pool, one password at a time, so logins keep running
+    report = import_users(db.session, User, rows)
+    return jsonify(report), 200
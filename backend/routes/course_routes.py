@@ -1,73 +1,129 @@
-from flask import Blueprint, request, jsonify
-from app import db
-from models import Course
+from flask import Blueprint, Response, g, request, jsonify
+from extensions import db
+from config import COURSES_PAGE_SIZE, COURSES_MAX_PAGE_SIZE, SEARCH_PAGE_SIZE, SEARCH_MAX_PAGE_SIZE
+from models import Course, EnrollmentDailyStat
 from auth_utils import verify_token
+from idempotency import idempotent
+from db_routing import read_replica
+from catalog_cache import catalog_cache, cached_json_response
+from course_events import course_events
+import course_search
+from course_listing import DEFAULT_FIELDS, course_rows_to_json, decode_cursor, list_courses, parse_fields, parse_sort
+from serializers import serialize, serialize_one
 
 course_bp = Blueprint('courses', __name__, url_prefix='/api/courses')
 
 @course_bp.route('', methods=['GET'])
+@read_replica
 def get_all_courses():
-    courses = Course.query.all()
-    return jsonify([{
-        'id': c.id,
-        'name': c.name,
-        'description': c.description,
-        'instructor': c.instructor,
-        'createdAt': c.createdAt.isoformat()
-    } for c in courses]), 200
+    # Plain requests get the whole cached catalog; limit/cursor/fields/sort switch to a keyset-paginated page
+    if not any(arg in request.args for arg in ('limit', 'cursor', 'fields', 'sort')):
+        # Built on the primary: a body from a lagging replica would stay cached for the whole version
+        g.read_replica = False
+        def build():
+            rows = db.session.query(*(getattr(Course, name) for name in DEFAULT_FIELDS)).all()
+            return course_rows_to_json(rows, DEFAULT_FIELDS)
+        
+        return cached_json_response(catalog_cache, build)
+    
+    try:
+        fields = parse_fields(request.args.get('fields'))
+        sort, descending = parse_sort(request.args.get('sort'))
+        cursor = request.args.get('cursor')
+        cursor = decode_cursor(cursor, sort) if cursor else None
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    limit = min(max(request.args.get('limit', COURSES_PAGE_SIZE, type=int), 1), COURSES_MAX_PAGE_SIZE)
+    rows, next_cursor = list_courses(db.session, Course, fields, sort, descending, cursor, limit)
+    
+    response = jsonify(course_rows_to_json(rows, fields))
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response, 200
+
+@course_bp.route('/search', methods=['GET'])
+@read_replica
+def search_courses():
+    # Ranked, paginated by offset: ?q=<text>&cursor=<offset>&limit=N
+    q = request.args.get('q', '').strip()
+    if not q:
+        return jsonify({'message': 'Search query required'}), 400
+    
+    offset = max(request.args.get('cursor', 0, type=int), 0)
+    limit = min(max(request.args.get('limit', SEARCH_PAGE_SIZE, type=int), 1), SEARCH_MAX_PAGE_SIZE)
+    rows = course_search.search_courses(db.session, q, limit + 1, offset)
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    
+    response = jsonify(serialize('course', rows))
+    if has_more:
+        response.headers['X-Next-Cursor'] = str(offset + limit)
+    return response, 200
+
+@course_bp.route('/stream', methods=['GET'])
+def course_stream():
+    # Server-sent events: course-created, course-deleted and seats; clients refetch the catalog on ready and resync
+    subscription = course_events.subscribe()
+    if subscription is None:
+        return jsonify({'message': 'Too many open streams, retry shortly'}), 503, {'Retry-After': '5'}
+    
+    response = Response(course_events.stream(subscription), mimetype='text/event-stream')
+    # The server closes every response, including one whose body was never read, so the slot always comes back
+    response.call_on_close(lambda: course_events.unsubscribe(subscription))
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
 
 @course_bp.route('/<int:course_id>', methods=['GET'])
+@read_replica
 def get_course(course_id):
     course = Course.query.get(course_id)
     if not course:
         return jsonify({'message': 'Course not found'}), 404
     
-    return jsonify({
-        'id': course.id,
-        'name': course.name,
-        'description': course.description,
-        'instructor': course.instructor,
-        'createdAt': course.createdAt.isoformat()
-    }), 200
+    return jsonify(serialize_one('course_detail', course)), 200
 
 @course_bp.route('', methods=['POST'])
-@verify_token
+@verify_token(role='admin')
+@idempotent
 def create_course():
-    if request.user['role'] != 'admin':
-        return jsonify({'message': 'Admin access required'}), 403
-    
     data = request.get_json()
     
     if not data or not data.get('name') or not data.get('description') or not data.get('instructor'):
         return jsonify({'message': 'Name, description, and instructor required'}), 400
     
+    capacity = data.get('capacity')
+    if capacity is not None and (not isinstance(capacity, int) or isinstance(capacity, bool) or capacity < 1):
+        return jsonify({'message': 'Capacity must be a positive integer'}), 400
+    
     new_course = Course(
         name=data['name'],
         description=data['description'],
-        instructor=data['instructor']
+        instructor=data['instructor'],
+        capacity=capacity
     )
     
     db.session.add(new_course)
     db.session.commit()
+    catalog_cache.invalidate()
     
-    return jsonify({
-        'id': new_course.id,
-        'name': new_course.name,
-        'description': new_course.description,
-        'instructor': new_course.instructor
-    }), 201
+    result = serialize_one('course_detail', new_course)
+    course_events.course_created(result)
+    return jsonify(result), 201
 
 @course_bp.route('/<int:course_id>', methods=['DELETE'])
-@verify_token
+@verify_token(role='admin')
+@idempotent
 def delete_course(course_id):
-    if request.user['role'] != 'admin':
-        return jsonify({'message': 'Admin access required'}), 403
-    
     course = Course.query.get(course_id)
     if not course:
         return jsonify({'message': 'Course not found'}), 404
     
+    EnrollmentDailyStat.query.filter_by(courseId=course_id).delete()
     db.session.delete(course)
     db.session.commit()
+    catalog_cache.invalidate()
+    course_events.course_deleted(course_id)
     
     return jsonify({'message': 'Course deleted'}), 200
@@ -0,0 +1,41 @@
+import hashlib
+from flask import Blueprint, Response, request
+from extensions import db
+from models import Course, Enrollment
+from auth_utils import verify_token
+from db_routing import read_replica
+from serializers import dumps, serialize
+
+dashboard_bp = Blueprint('dashboard', __name__, url_prefix='/api/dashboard')
+
+@dashboard_bp.route('', methods=['GET'])
+@verify_token
+@read_replica
+def get_dashboard():
+    # The whole catalog with seats and the caller's enrollments: one LEFT JOIN, one statement
+    rows = db.session.query(
+        Course.id,
+        Course.name,
+        Course.description,
+        Course.instructor,
+        Course.capacity,
+        Course.createdAt,
+        Course.seatsTaken,
+        db.type_coerce(Enrollment.id.isnot(None), db.Boolean).label('enrolled'),
+        Enrollment.id.label('enrollmentId'),
+        Enrollment.enrollmentDate
+    ).outerjoin(Enrollment, db.and_(
+        Enrollment.courseId == Course.id,
+        Enrollment.studentId == request.user['userId']
+    )).order_by(Course.id).all()
+    
+    # Seat counts make the body change often, so the query always runs; a matching ETag saves the transfer
+    body = dumps(serialize('dashboard_course', rows))
+    etag = hashlib.sha1(body).hexdigest()
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
@@ -1,71 +1,225 @@
 from flask import Blueprint, request, jsonify
-from app import db
-from models import Enrollment, User, Course
+from extensions import db
+from config import ENROLLMENTS_PAGE_SIZE, ENROLLMENTS_MAX_PAGE_SIZE, BATCH_ENROLL_MAX, STATS_DAYS, STATS_MAX_DAYS, STATS_TOP_COURSES
+from models import Enrollment, EnrollmentDailyStat, User, Course
+from enrollment_stats import record_enrollments
+from enrollment_batch import enroll_pairs
+from course_events import course_events
+from enrollment_queue import enrollment_queue
 from auth_utils import verify_token
+from idempotency import idempotent
+from db_routing import read_replica
+from export_utils import export_response
+from serializers import serialize, serialize_one
 from sqlalchemy.exc import IntegrityError
+from datetime import datetime, timedelta
 
 enrollment_bp = Blueprint('enrollments', __name__, url_prefix='/api/enrollments')
 
 @enrollment_bp.route('', methods=['POST'])
 @verify_token
+@idempotent
 def enroll():
     data = request.get_json()
     
     if not data or not data.get('courseId'):
         return jsonify({'message': 'Course ID required'}), 400
     
-    course = Course.query.get(data['courseId'])
-    if not course:
-        return jsonify({'message': 'Course not found'}), 404
+    course_id = data['courseId']
+    if enrollment_queue.enabled:
+        return queue_enrollment(course_id)
     
     try:
+        # Insert first so duplicates fail before touching the contended course row
         enrollment = Enrollment(
             studentId=request.user['userId'],
-            courseId=data['courseId']
+            courseId=course_id,
+            enrollmentDate=datetime.utcnow()
         )
         db.session.add(enrollment)
+        db.session.flush()
+        
+        # Claim a seat with one conditional UPDATE; the row lock is held only until commit
+        claimed = seat_available(course_id).update({Course.seatsTaken: Course.seatsTaken + 1}, synchronize_session=False)
+        
+        if not claimed:
+            db.session.rollback()
+            if not course_exists(course_id):
+                return jsonify({'message': 'Course not found'}), 404
+            return jsonify({'message': 'Course is full'}), 409
+        
+        record_enrollments(db.session, EnrollmentDailyStat, {(course_id, enrollment.enrollmentDate.date()): 1})
+        # Built before commit, which would expire the instance and cost a reload
+        result = serialize_one('enrollment', enrollment)
         db.session.commit()
+        course_events.seats_changed([course_id])
         
-        return jsonify({
-            'id': enrollment.id,
-            'studentId': enrollment.studentId,
-            'courseId': enrollment.courseId,
-            'enrollmentDate': enrollment.enrollmentDate.isoformat()
-        }), 201
+        return jsonify(result), 201
     except IntegrityError:
         db.session.rollback()
+        if not course_exists(course_id):
+            return jsonify({'message': 'Course not found'}), 404
         return jsonify({'message': 'Already enrolled in this course'}), 400
 
+def seat_available(course_id):
+    """The course row, if it still has a free seat"""
+    return Course.query.filter(
+        Course.id == course_id,
+        db.or_(Course.capacity.is_(None), Course.seatsTaken < Course.capacity)
+    )
+
+def course_exists(course_id):
+    return db.session.query(Course.id).filter_by(id=course_id).first() is not None
+
+def queue_enrollment(course_id):
+    # Unknown courses are rejected now; duplicates and seats are settled when the queue commits
+    if not isinstance(course_id, int) or isinstance(course_id, bool):
+        return jsonify({'message': 'Course ID must be an integer'}), 400
+    if not course_exists(course_id):
+        return jsonify({'message': 'Course not found'}), 404
+    
+    ticket = enrollment_queue.enqueue(request.user['userId'], course_id)
+    response = jsonify({'ticket': ticket, 'status': 'queued', 'courseId': course_id})
+    response.headers['Location'] = f'/api/enrollments/tickets/{ticket}'
+    return response, 202
+
+@enrollment_bp.route('/tickets/<ticket>', methods=['GET'])
+@verify_token
+def get_ticket(ticket):
+    row = enrollment_queue.ticket(ticket)
+    if row is None or row['studentId'] != request.user['userId']:
+        return jsonify({'message': 'Ticket not found'}), 404
+    
+    result = {'ticket': ticket, 'courseId': row['courseId'], 'status': row['status'] or 'queued'}
+    if row['enrollmentId'] is not None:
+        result['enrollmentId'] = row['enrollmentId']
+    response = jsonify(result)
+    if row['status'] is None:
+        response.headers['Retry-After'] = '1'
+    return response, 200
+
+@enrollment_bp.route('/batch', methods=['POST'])
+@verify_token(role='admin')
+@idempotent
+def batch_enroll():
+    data = request.get_json()
+    items = data.get('enrollments') if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        return jsonify({'message': 'A non-empty enrollments list is required'}), 400
+    if len(items) > BATCH_ENROLL_MAX:
+        return jsonify({'message': f'At most {BATCH_ENROLL_MAX} enrollments per batch'}), 400
+    
+    results = []
+    for item in items:
+        pair = (item.get('studentId'), item.get('courseId')) if isinstance(item, dict) else (None, None)
+        valid = all(isinstance(v, int) and not isinstance(v, bool) for v in pair)
+        results.append({'studentId': pair[0], 'courseId': pair[1], 'status': None if valid else 'invalid'})
+    
+    touched = enroll_pairs(db.session, results, datetime.utcnow())
+    db.session.commit()
+    course_events.seats_changed(touched)
+    
+    summary = {}
+    for r in results:
+        summary[r['status']] = summary.get(r['status'], 0) + 1
+    return jsonify({'results': results, 'summary': summary}), 200
+
+@enrollment_bp.route('/stats', methods=['GET'])
+@verify_token(role='admin')
+@read_replica
+def get_enrollment_stats():
+    # Served from courses.seatsTaken and enrollment_daily_stats: O(courses + courses * days), never O(enrollments)
+    days = min(max(request.args.get('days', STATS_DAYS, type=int), 1), STATS_MAX_DAYS)
+    top = min(max(request.args.get('top', STATS_TOP_COURSES, type=int), 0), 100)
+    
+    courses = db.session.query(Course.id, Course.name, Course.capacity, Course.seatsTaken).order_by(Course.id).all()
+    since = datetime.utcnow().date() - timedelta(days=days - 1)
+    daily = db.session.query(
+        EnrollmentDailyStat.day,
+        db.func.sum(EnrollmentDailyStat.enrollments).label('enrollments')
+    ).filter(EnrollmentDailyStat.day >= since).group_by(EnrollmentDailyStat.day).order_by(EnrollmentDailyStat.day).all()
+    
+    per_course = [{
+        'courseId': c.id,
+        'name': c.name,
+        'capacity': c.capacity,
+        'enrollments': c.seatsTaken
+    } for c in courses]
+    
+    return jsonify({
+        'totalEnrollments': sum(c['enrollments'] for c in per_course),
+        'courses': per_course,
+        'topCourses': sorted(per_course, key=lambda c: (-c['enrollments'], c['courseId']))[:top],
+        'daily': [{'day': d.day, 'enrollments': int(d.enrollments)} for d in daily]
+    }), 200
+
+@enrollment_bp.route('/export', methods=['GET'])
+@verify_token(role='admin')
+@read_replica
+def export_enrollments():
+    query = db.session.query(
+        Enrollment.id,
+        Enrollment.studentId,
+        User.email.label('studentEmail'),
+        Enrollment.courseId,
+        Course.name.label('courseName'),
+        Enrollment.enrollmentDate
+    ).join(User, Enrollment.studentId == User.id).join(Course, Enrollment.courseId == Course.id).order_by(Enrollment.id)
+    
+    columns = ['id', 'studentId', 'studentEmail', 'courseId', 'courseName', 'enrollmentDate']
+    return export_response(query, columns, 'enrollments')
+
 @enrollment_bp.route('/my-courses', methods=['GET'])
 @verify_token
+@read_replica
 def get_my_courses():
-    enrollments = Enrollment.query.filter_by(studentId=request.user['userId']).all()
-    
-    return jsonify([{
-        'id': e.id,
-        'courseId': e.courseId,
-        'course': {
-            'id': e.course.id,
-            'name': e.course.name,
-            'description': e.course.description,
-            'instructor': e.course.instructor
-        },
-        'enrollmentDate': e.enrollmentDate.isoformat()
-    } for e in enrollments]), 200
+    rows = my_courses_query(request.user['userId']).all()
+    return jsonify(serialize('my_course', rows)), 200
+
+def my_courses_query(student_id):
+    # One joined, column-only query rather than a lazy e.course load per enrollment
+    return db.session.query(
+        Enrollment.id,
+        Enrollment.courseId,
+        Enrollment.enrollmentDate,
+        Course.name,
+        Course.description,
+        Course.instructor
+    ).join(Course, Enrollment.courseId == Course.id).filter(Enrollment.studentId == student_id)
 
 @enrollment_bp.route('', methods=['GET'])
-@verify_token
+@verify_token(role='admin')
+@read_replica
 def get_all_enrollments():
-    if request.user['role'] != 'admin':
-        return jsonify({'message': 'Admin access required'}), 403
+    # Keyset pagination on id: ?cursor=<last id seen>&limit=N, optional courseId/studentId filters
+    cursor = request.args.get('cursor', type=int)
+    limit = min(max(request.args.get('limit', ENROLLMENTS_PAGE_SIZE, type=int), 1), ENROLLMENTS_MAX_PAGE_SIZE)
     
-    enrollments = Enrollment.query.all()
+    course_id = request.args.get('courseId', type=int)
+    student_id = request.args.get('studentId', type=int)
+    rows = enrollments_page_query(course_id, student_id, cursor, limit).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
     
-    return jsonify([{
-        'id': e.id,
-        'studentId': e.studentId,
-        'studentEmail': e.student.email,
-        'courseId': e.courseId,
-        'courseName': e.course.name,
-        'enrollmentDate': e.enrollmentDate.isoformat()
-    } for e in enrollments]), 200
+    response = jsonify(serialize('enrollment_admin', rows))
+    if has_more:
+        response.headers['X-Next-Cursor'] = str(rows[-1].id)
+    return response, 200
+
+def enrollments_page_query(course_id, student_id, cursor, limit):
+    query = db.session.query(
+        Enrollment.id,
+        Enrollment.studentId,
+        User.email.label('studentEmail'),
+        Enrollment.courseId,
+        Course.name.label('courseName'),
+        Enrollment.enrollmentDate
+    ).join(User, Enrollment.studentId == User.id).join(Course, Enrollment.courseId == Course.id)
+    if course_id is not None:
+        query = query.filter(Enrollment.courseId == course_id)
+    if student_id is not None:
+        query = query.filter(Enrollment.studentId == student_id)
+    if cursor is not None:
+        query = query.filter(Enrollment.id > cursor)
+    # One extra row tells whether another page exists
+    return query.order_by(Enrollment.id).limit(limit + 1)
@@ -0,0 +1,23 @@
+from flask import Blueprint, jsonify
+from auth_utils import token_cache
+from metrics import metrics_response, registry
+
+health_bp = Blueprint('health', __name__, url_prefix='/api')
+
+@health_bp.route('/health', methods=['GET'])
+def health():
+    return jsonify({'status': 'ok', 'tokenCache': token_cache.stats()})
+
+@health_bp.route('/metrics', methods=['GET'])
+def metrics():
+    return metrics_response()
+
+def token_cache_samples():
+    stats = token_cache.stats()
+    return {
+        ('token_cache_hits_total', ()): stats['hits'],
+        ('token_cache_misses_total', ()): stats['misses'],
+        ('token_cache_entries', ()): stats['size']
+    }
+
+registry.add_collector(token_cache_samples)
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""Default courses and admin account, created once per database.
+
+Every process that starts the app calls init_database(); the work runs under a
+startup lock (a PostgreSQL advisory lock, or a file lock beside a SQLite
+database) so N workers booting together do not race, and once the data exists
+each later call is two indexed lookups. Run it from the deploy step instead
+with:
+
+    python seed.py
+"""
+
+import os
+from contextlib import contextmanager
+from sqlalchemy import text
+from extensions import db
+from models import Course, User
+from migrate import current_version, latest_version, upgrade
+from password_hashing import hash_with_current_params
+from catalog_cache import catalog_cache
+
+try:
+    import fcntl
+except ImportError:  # Windows: no file locking, single-process dev servers only
+    fcntl = None
+
+ADMIN_EMAIL = os.getenv('ADMIN_EMAIL', 'admin@uni.ge')
+ADMIN_PASSWORD = os.getenv('ADMIN_PASSWORD', 'admin123')
+
+# Key for pg_advisory_lock; any constant shared by every process of this app
+STARTUP_LOCK_KEY = 0x4D696E69
+
+# Georgian courses
+COURSES = [
+    {
+        'name': 'კალკულუსი',
+        'description': 'გამოთვლების საფუძველი - ლიმიტები, წარმოებულები, ინტეგრალები',
+        'instructor': 'ა.გ. მათემატიკა'
+    },
+    {
+        'name': 'წრფივი ალგებრა',
+        'description': 'ვექტორები, მატრიცები, სიმეტრიული სისტემები',
+        'instructor': 'ბ.კ. ალგებრა'
+    },
+    {
+        'name': 'დისკრეტული სტრუქტურები',
+        'description': 'სიმრავლეები, გრაფები, ლოგიკა, მთელი რიცხვები',
+        'instructor': 'გ.მ. დისკრეტული მათემატიკა'
+    },
+    {
+        'name': 'პითონის საწყისები',
+        'description': 'პითონის ენის საფუძვლები, ფუნქციები, მოდულები',
+        'instructor': 'დ.ს. პროგრამირება'
+    },
+    {
+        'name': 'ჯავას საწყისები',
+        'description': 'ობიექტ-ორიენტირებული პროგრამირება, კლასები, მიმოწერა',
+        'instructor': 'ე.ი. ჯავა'
+    }
+]
+
+@contextmanager
+def startup_lock(engine):
+    """Serialize startup work across every process sharing this database"""
+    if engine.dialect.name == 'postgresql':
+        with engine.connect() as conn:
+            conn.execute(text('SELECT pg_advisory_lock(:key)'), {'key': STARTUP_LOCK_KEY})
+            try:
+                yield
+            finally:
+                conn.execute(text('SELECT pg_advisory_unlock(:key)'), {'key': STARTUP_LOCK_KEY})
+        return
+    path = engine.url.database if engine.dialect.name == 'sqlite' else None
+    if fcntl is None or not path or path == ':memory:':
+        yield
+        return
+    with open(f'{path}.init-lock', 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+def ensure_admin(session):
+    """Add the default admin account if it is missing (caller commits)"""
+    if session.query(User.id).filter_by(email=ADMIN_EMAIL).first():
+        return False
+    session.add(User(email=ADMIN_EMAIL, password=hash_with_current_params(ADMIN_PASSWORD), role='admin'))
+    return True
+
+def add_courses(session):
+    """Add the default catalog (caller commits)"""
+    session.add_all(Course(**course) for course in COURSES)
+
+def seed_database(session):
+    """Create the default catalog and admin once; True if anything was added"""
+    seeded = False
+    if session.query(Course.id).first() is None:
+        add_courses(session)
+        seeded = True
+    seeded = ensure_admin(session) or seeded
+    if seeded:
+        session.commit()
+    return seeded
+
+def init_database(app, migrate=False, log=print):
+    """Bring the schema up (optionally) and seed, at most one process at a time.
+
+    Without migrate, a schema behind the code is reported and left alone; the
+    deploy step (python migrate.py upgrade) owns migrations. Returns True if
+    data was seeded.
+    """
+    with app.app_context():
+        engine = db.engine
+        try:
+            with startup_lock(engine):
+                if migrate:
+                    upgrade(engine, log=log)
+                elif current_version(engine) < latest_version():
+                    log(f"Database schema is behind (version {current_version(engine)} of {latest_version()}); run: python migrate.py upgrade")
+                    return False
+                seeded = seed_database(db.session)
+                if seeded:
+                    # Running workers see the new catalog on their next version check
+                    catalog_cache.invalidate()
+        finally:
+            # With preload_app this runs in the gunicorn master; forked workers must not share its connections
+            db.session.remove()
+            engine.dispose()
+    if seeded:
+        log("Database initialized with default courses and admin account")
+    return seeded
+
+if __name__ == '__main__':
+    from app import create_app
+    init_database(create_app())
@@ -0,0 +1,159 @@
+"""Response shapes for users, courses and enrollments, and the JSON encoder.
+
+Handlers pass result rows (column-only query rows or ORM instances; anything
+with the attributes) to a registered shape instead of building dicts by hand:
+
+    serialize('course', rows)        -> list of dicts
+    serialize_one('course', course)  -> one dict
+
+Each shape compiles its projection once into an itemgetter over the row's
+column positions, so a row costs one C-level fetch plus a zip. Values stay
+native (datetimes included) and dumps() renders them the same way everywhere:
+orjson when it is installed, the stdlib encoder otherwise. install(app) makes jsonify use dumps() too.
+"""
+
+import json
+from datetime import date
+from decimal import Decimal
+from functools import lru_cache
+from operator import attrgetter, itemgetter
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _default(value):
+    # orjson handles datetimes itself; the stdlib encoder needs this for the same output
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+def plain(value):
+    """A single value as it appears in JSON output (for CSV cells and cursors)"""
+    return value.isoformat() if isinstance(value, date) else value
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def dumps(obj):
+        """Compact UTF-8 JSON bytes"""
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+
+    loads = orjson.loads
+else:
+    _encoder = json.JSONEncoder(default=_default, ensure_ascii=False, separators=(',', ':'))
+
+    def dumps(obj):
+        """Compact UTF-8 JSON bytes"""
+        return _encoder.encode(obj).encode('utf-8')
+
+    loads = json.loads
+
+class Shape:
+    """A precompiled projection of row attributes onto output keys.
+
+    fields are attribute names, or (key, attribute) pairs to rename, or
+    (key, Shape) pairs to nest another shape read from the same row.
+    Result rows are read by position: the attribute positions are looked up
+    once per distinct column layout and cached as an itemgetter, which is
+    several times cheaper than named access on a Row. ORM instances and other
+    objects fall back to an attrgetter.
+    """
+
+    def __init__(self, *fields):
+        self.keys = []
+        self.attributes = []
+        self.nested = []
+        for field in fields:
+            key, source = (field, field) if isinstance(field, str) else field
+            if isinstance(source, Shape):
+                self.nested.append((key, source))
+            else:
+                self.keys.append(key)
+                self.attributes.append(source)
+        self._by_attribute = self._tupled(attrgetter(*self.attributes))
+        self._by_layout = {}
+
+    def _tupled(self, getter):
+        # Getters of one name return the bare value rather than a 1-tuple
+        return getter if len(self.attributes) > 1 else (lambda row: (getter(row),))
+
+    def _values_for(self, row):
+        layout = getattr(row, '_fields', None)
+        if layout is None:
+            return self._by_attribute
+        values = self._by_layout.get(layout)
+        if values is None:
+            try:
+                values = self._tupled(itemgetter(*(layout.index(a) for a in self.attributes)))
+            except ValueError:
+                raise AttributeError(f'Row has no column for one of {", ".join(self.attributes)}')
+            self._by_layout[layout] = values
+        return values
+
+    def one(self, row):
+        result = dict(zip(self.keys, self._values_for(row)(row)))
+        for key, shape in self.nested:
+            result[key] = shape.one(row)
+        return result
+
+    def many(self, rows):
+        rows = rows if isinstance(rows, list) else list(rows)
+        if not rows:
+            return []
+        if self.nested:
+            return [self.one(row) for row in rows]
+        keys, values = self.keys, self._values_for(rows[0])
+        return [dict(zip(keys, values(row))) for row in rows]
+
+COURSE_CATALOG_FIELDS = ('id', 'name', 'description', 'instructor', 'capacity', 'createdAt')
+
+SHAPES = {
+    'user': Shape(('userId', 'id'), 'email', 'role'),
+    'course': Shape(*COURSE_CATALOG_FIELDS),
+    'course_detail': Shape(*COURSE_CATALOG_FIELDS, 'seatsTaken'),
+    'enrollment': Shape('id', 'studentId', 'courseId', 'enrollmentDate'),
+    'enrollment_admin': Shape('id', 'studentId', 'studentEmail', 'courseId', 'courseName', 'enrollmentDate'),
+    'seats': Shape(('courseId', 'id'), 'seatsTaken', 'capacity'),
+    'dashboard_course': Shape(*COURSE_CATALOG_FIELDS, 'seatsTaken', 'enrolled', 'enrollmentId', 'enrollmentDate'),
+    'my_course': Shape('id', 'courseId', ('course', Shape(('id', 'courseId'), 'name', 'description', 'instructor')), 'enrollmentDate')
+}
+
+def register(name, *fields):
+    """Add a shape to the registry; names are unique"""
+    if name in SHAPES:
+        raise ValueError(f'Shape {name} already registered')
+    SHAPES[name] = Shape(*fields)
+    return SHAPES[name]
+
+def serialize(name, rows):
+    return SHAPES[name].many(rows)
+
+def serialize_one(name, row):
+    return SHAPES[name].one(row)
+
+@lru_cache(maxsize=256)
+def projection(fields):
+    """Shape for a client-chosen tuple of attribute names (e.g. ?fields=), compiled once per tuple"""
+    return Shape(*fields)
+
+class FastJSONProvider(JSONProvider):
+    """Flask JSON provider backed by dumps()/loads() above"""
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj), mimetype='application/json')
+
+def install(app):
+    """Route jsonify, request.get_json and app.json through the fast encoder"""
+    app.json = FastJSONProvider(app)
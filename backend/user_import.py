@@ -0,0 +1,112 @@
+import csv
+import io
+import json
+from concurrent.futures import ProcessPoolExecutor
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from password_hashing import hash_password, hash_with_current_params
+
+ROLES = ('student', 'admin')
+
+# Passwords handed to each pool worker per task; large enough to amortise pickling
+HASH_CHUNK_SIZE = 64
+
+# Emails per IN (...) lookup, well under the PostgreSQL/SQLite bind parameter limits
+LOOKUP_CHUNK_SIZE = 1000
+
+def parse_users(text, fmt):
+    """Parse a CSV (email,password[,role] header) or JSON list of user objects"""
+    if fmt == 'csv':
+        return list(csv.DictReader(io.StringIO(text)))
+    data = json.loads(text)
+    if isinstance(data, dict):
+        data = data.get('users')
+    if not isinstance(data, list):
+        raise ValueError('Expected a JSON list of users')
+    return data
+
+def hash_passwords(passwords, workers=1, progress=None):
+    """Hash passwords one at a time on the shared bounded hashing pool, or across
+    a process pool of `workers` processes (offline imports only: never fork a
+    threaded server worker)"""
+    pool = None
+    if workers > 1 and len(passwords) >= HASH_CHUNK_SIZE:
+        pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        if pool:
+            results = pool.map(hash_with_current_params, passwords, chunksize=HASH_CHUNK_SIZE)
+        else:
+            # One slot at a time, so logins keep the rest of the pool
+            results = (hash_password(p, wait=True) for p in passwords)
+        hashes = []
+        for hashed in results:
+            hashes.append(hashed)
+            if progress and (len(hashes) % HASH_CHUNK_SIZE == 0 or len(hashes) == len(passwords)):
+                progress(len(hashes), len(passwords))
+        return hashes
+    finally:
+        if pool:
+            pool.shutdown()
+
+def insert_users_ignoring_duplicates(session, User, rows):
+    """Insert user rows in chunks, skipping emails that already exist; returns the emails inserted"""
+    table = User.__table__
+    inserted = set()
+    for start in range(0, len(rows), LOOKUP_CHUNK_SIZE):
+        chunk = rows[start:start + LOOKUP_CHUNK_SIZE]
+        if session.bind.dialect.name == 'postgresql':
+            stmt = pg_insert(table).values(chunk).on_conflict_do_nothing(index_elements=['email'])
+            inserted.update(email for (email,) in session.execute(stmt.returning(table.c.email)))
+            continue
+        session.execute(sqlite_insert(table).values(chunk).on_conflict_do_nothing(index_elements=['email']))
+        # No RETURNING for SQLite in SQLAlchemy 1.4; salted hashes are unique, so ours identify our rows
+        ours = {r['email']: r['password'] for r in chunk}
+        inserted.update(
+            email for email, password in session.query(User.email, User.password).filter(User.email.in_(ours))
+            if ours[email] == password
+        )
+    return inserted
+
+def import_users(session, User, rows, workers=1, progress=None):
+    """Validate, deduplicate, hash and bulk-insert users; returns a report dict"""
+    errors = []
+    accepted = {}
+    for number, row in enumerate(rows, start=1):
+        if not isinstance(row, dict):
+            errors.append({'row': number, 'message': 'Row must be an object'})
+            continue
+        email = str(row.get('email') or '').strip()
+        password = str(row.get('password') or '')
+        role = str(row.get('role') or 'student').strip()
+        if not email or not password:
+            errors.append({'row': number, 'email': email, 'message': 'Email and password required'})
+        elif role not in ROLES:
+            errors.append({'row': number, 'email': email, 'message': f'Role must be one of {", ".join(ROLES)}'})
+        elif email in accepted:
+            errors.append({'row': number, 'email': email, 'message': 'Duplicate email in import'})
+        else:
+            accepted[email] = (number, password, role)
+
+    # One set-based lookup (chunked) instead of an exists-query per user
+    emails = list(accepted)
+    existing = set()
+    for start in range(0, len(emails), LOOKUP_CHUNK_SIZE):
+        chunk = emails[start:start + LOOKUP_CHUNK_SIZE]
+        existing.update(e for (e,) in session.query(User.email).filter(User.email.in_(chunk)))
+    for email in sorted(existing, key=lambda e: accepted[e][0]):
+        errors.append({'row': accepted.pop(email)[0], 'email': email, 'message': 'Email already exists'})
+
+    emails = list(accepted)
+    hashes = hash_passwords([accepted[e][1] for e in emails], workers=workers, progress=progress)
+    # An email created since the lookup above is skipped here and reported, not a failed batch
+    inserted = insert_users_ignoring_duplicates(session, User, [
+        {'email': email, 'password': hashed, 'role': accepted[email][2]}
+        for email, hashed in zip(emails, hashes)
+    ])
+    session.commit()
+    for email in emails:
+        if email not in inserted:
+            errors.append({'row': accepted[email][0], 'email': email, 'message': 'Email already exists'})
+
+    errors.sort(key=lambda e: e['row'])
+    return {'created': len(inserted), 'failed': len(errors), 'errors': errors}
@@ -2,6 +2,7 @@ import { useState, useEffect } from 'react'
 import LoginPage from './pages/LoginPage'
 import StudentDashboard from './pages/StudentDashboard'
 import AdminDashboard from './pages/AdminDashboard'
+import axiosInstance from './api/axiosConfig'
 import './App.css'
 
 function App() {
@@ -18,7 +19,10 @@ function App() {
   }, [])
 
   const handleLogout = () => {
+    const refreshToken = localStorage.getItem('refreshToken')
+    axiosInstance.post('/api/auth/logout', { refreshToken }).catch(() => {})
     localStorage.removeItem('token')
+    localStorage.removeItem('refreshToken')
     localStorage.removeItem('role')
     localStorage.removeItem('userId')
     setUser(null)
@@ -1,6 +1,6 @@
 import axios from 'axios'
 
-const API_BASE_URL = import.meta.env.VITE_API_URL || 'http://localhost:5001'
+export const API_BASE_URL = import.meta.env.VITE_API_URL || 'http://localhost:5001'
 
 console.log('API Base URL:', API_BASE_URL)
 
@@ -11,13 +11,57 @@ const axiosInstance = axios.create({
   }
 })
 
+// After our own writes the API asks us to read from the primary database for a few seconds
+let primaryUntil = 0
+
 // Add token to all requests
 axiosInstance.interceptors.request.use((config) => {
   const token = localStorage.getItem('token')
   if (token) {
     config.headers.Authorization = `Bearer ${token}`
   }
+  // One key per logical write, kept across retries of this config, so the server runs it once
+  if (['post', 'delete'].includes(config.method) && !config.headers['Idempotency-Key']) {
+    config.headers['Idempotency-Key'] = crypto.randomUUID()
+  }
+  if (primaryUntil * 1000 > Date.now()) {
+    config.headers['X-Primary-Until'] = primaryUntil
+  }
   return config
 })
 
+// Access tokens are short-lived: on an expired token, trade the refresh token for a new pair and retry once
+let refreshing = null
+
+axiosInstance.interceptors.response.use(
+  (response) => {
+    const until = parseFloat(response.headers['x-primary-until'])
+    if (until > primaryUntil) {
+      primaryUntil = until
+    }
+    return response
+  },
+  async (error) => {
+    const original = error.config
+    const refreshToken = localStorage.getItem('refreshToken')
+    if (
+      error.response?.status !== 401 ||
+      error.response?.data?.message !== 'Token expired' ||
+      !refreshToken ||
+      original._retried
+    ) {
+      return Promise.reject(error)
+    }
+    original._retried = true
+    refreshing = refreshing || axios.post(`${API_BASE_URL}/api/auth/refresh`, { refreshToken })
+      .then((response) => {
+        localStorage.setItem('token', response.data.token)
+        localStorage.setItem('refreshToken', response.data.refreshToken)
+      })
+      .finally(() => { refreshing = null })
+    await refreshing
+    return axiosInstance(original)
+  }
+)
+
 export default axiosInstance
@@ -5,6 +5,7 @@ import './AdminDashboard.css'
 function AdminDashboard() {
   const [courses, setCourses] = useState([])
   const [enrollments, setEnrollments] = useState([])
+  const [nextCursor, setNextCursor] = useState(null)
   const [showForm, setShowForm] = useState(false)
   const [newCourse, setNewCourse] = useState({ name: '', description: '', instructor: '' })
   const [loading, setLoading] = useState(true)
@@ -29,10 +30,13 @@ function AdminDashboard() {
     }
   }
 
-  const fetchEnrollments = async () => {
+  const fetchEnrollments = async (cursor = null) => {
     try {
-      const response = await axiosInstance.get('/api/enrollments')
-      setEnrollments(response.data)
+      const response = await axiosInstance.get('/api/enrollments', {
+        params: cursor ? { cursor } : {}
+      })
+      setEnrollments(prev => (cursor ? [...prev, ...response.data] : response.data))
+      setNextCursor(response.headers['x-next-cursor'] || null)
     } catch (err) {
       setError('Failed to load enrollments: ' + (err.response?.data?.error || err.message))
     }
@@ -173,6 +177,11 @@ function AdminDashboard() {
                   ))}
                 </tbody>
               </table>
+              {nextCursor && (
+                <button onClick={() => fetchEnrollments(nextCursor)} className="load-more-btn">
+                  Load more
+                </button>
+              )}
             </div>
           )}
         </div>
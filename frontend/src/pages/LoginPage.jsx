@@ -35,6 +35,7 @@ function LoginPage({ setUser }) {
       })
 
       localStorage.setItem('token', response.data.token)
+      localStorage.setItem('refreshToken', response.data.refreshToken)
       localStorage.setItem('role', response.data.role)
       localStorage.setItem('userId', response.data.userId)
 
@@ -1,49 +1,97 @@
 import { useState, useEffect } from 'react'
-import axiosInstance from '../api/axiosConfig'
+import axiosInstance, { API_BASE_URL } from '../api/axiosConfig'
 import './StudentDashboard.css'
 
+// Refresh interval when the change stream is unavailable; unchanged dashboards answer 304
+const DASHBOARD_POLL_MS = 10000
+
 function StudentDashboard() {
   const [courses, setCourses] = useState([])
   const [enrolledCourses, setEnrolledCourses] = useState([])
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState('')
   const [success, setSuccess] = useState('')
+  const [seats, setSeats] = useState({})
 
   useEffect(() => {
-    fetchCourses()
-    fetchEnrolledCourses()
+    fetchDashboard()
+
+    // Catalog and seat changes are pushed; the server sends `ready` on every (re)connect
+    // and `resync` when we fell behind, and either way we reload the dashboard once
+    // (usually a 304, since the browser revalidates with the dashboard's ETag)
+    const events = new EventSource(`${API_BASE_URL}/api/courses/stream`)
+    events.addEventListener('ready', fetchDashboard)
+    events.addEventListener('resync', fetchDashboard)
+    events.addEventListener('course-created', (e) => {
+      const course = JSON.parse(e.data)
+      setCourses(current => current.some(c => c.id === course.id) ? current : [...current, course])
+    })
+    events.addEventListener('course-deleted', (e) => {
+      const { id } = JSON.parse(e.data)
+      setCourses(current => current.filter(c => c.id !== id))
+    })
+    events.addEventListener('seats', (e) => {
+      const update = JSON.parse(e.data)
+      setSeats(current => ({ ...current, [update.courseId]: update }))
+    })
+    // A 503 (every stream slot taken) closes the EventSource for good, so poll the dashboard instead
+    let poll = null
+    events.onerror = () => {
+      if (events.readyState === EventSource.CLOSED && !poll) {
+        poll = setInterval(fetchDashboard, DASHBOARD_POLL_MS)
+      }
+    }
+    return () => {
+      events.close()
+      clearInterval(poll)
+    }
   }, [])
 
-  const fetchCourses = async () => {
+  // One request for the catalog, seat counts and our own enrollments
+  const fetchDashboard = async () => {
     try {
-      const response = await axiosInstance.get('/api/courses')
+      const response = await axiosInstance.get('/api/dashboard')
       setCourses(response.data)
+      setSeats(Object.fromEntries(response.data.map(c => [c.id, { courseId: c.id, seatsTaken: c.seatsTaken, capacity: c.capacity }])))
+      setEnrolledCourses(response.data.filter(c => c.enrolled).map(c => c.id))
       setError('')
     } catch (err) {
       setError('Failed to load courses: ' + (err.response?.data?.error || err.message))
+    } finally {
+      setLoading(false)
     }
   }
 
-  const fetchEnrolledCourses = async () => {
-    try {
-      const response = await axiosInstance.get('/api/enrollments/my-courses')
-      setEnrolledCourses(response.data.map(e => e.courseId))
-      setLoading(false)
-    } catch (err) {
-      setError('Failed to load enrollments')
-      setLoading(false)
+  // With the server's enrollment queue on, enrolling answers 202 and a ticket to poll
+  const waitForTicket = async (ticket) => {
+    for (;;) {
+      const response = await axiosInstance.get(`/api/enrollments/tickets/${ticket}`)
+      if (response.data.status !== 'queued') {
+        return response.data.status
+      }
+      await new Promise(resolve => setTimeout(resolve, 1000))
     }
   }
 
   const handleEnroll = async (courseId) => {
     try {
-      await axiosInstance.post(
+      const response = await axiosInstance.post(
         '/api/enrollments',
         { courseId }
       )
+      if (response.status === 202) {
+        setSuccess('Enrollment requested...')
+        const status = await waitForTicket(response.data.ticket)
+        if (status !== 'accepted') {
+          setSuccess('')
+          setError(status === 'full' ? 'Failed to enroll: course is full' : `Failed to enroll: ${status}`)
+          setTimeout(() => setError(''), 3000)
+          return
+        }
+      }
       setSuccess('Successfully enrolled!')
       setTimeout(() => setSuccess(''), 3000)
-      fetchEnrolledCourses()
+      setEnrolledCourses(current => [...current, courseId])
     } catch (err) {
       setError('Failed to enroll: ' + (err.response?.data?.error || err.message))
       setTimeout(() => setError(''), 3000)
@@ -65,19 +113,26 @@ function StudentDashboard() {
         {courses.length === 0 ? (
           <p>No courses available yet</p>
         ) : (
-          courses.map(course => (
-            <div key={course.id} className="course-card">
-              <h3>{course.name}</h3>
-              <p>{course.description}</p>
-              <p className="instructor">Instructor: {course.instructor}</p>
-              
-              {enrolledCourses.includes(course.id) ? (
-                <button className="enrolled-btn" disabled>✓ Enrolled</button>
-              ) : (
-                <button onClick={() => handleEnroll(course.id)}>Enroll Now</button>
-              )}
-            </div>
-          ))
+          courses.map(course => {
+            const taken = seats[course.id]?.seatsTaken
+            const full = course.capacity != null && taken != null && taken >= course.capacity
+            return (
+              <div key={course.id} className="course-card">
+                <h3>{course.name}</h3>
+                <p>{course.description}</p>
+                <p className="instructor">Instructor: {course.instructor}</p>
+                {course.capacity != null && taken != null && (
+                  <p className="instructor">Seats left: {Math.max(course.capacity - taken, 0)} of {course.capacity}</p>
+                )}
+                
+                {enrolledCourses.includes(course.id) ? (
+                  <button className="enrolled-btn" disabled>✓ Enrolled</button>
+                ) : (
+                  <button onClick={() => handleEnroll(course.id)} disabled={full}>{full ? 'Full' : 'Enroll Now'}</button>
+                )}
+              </div>
+            )
+          })
         )}
       </div>
 